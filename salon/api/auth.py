@@ -10,6 +10,7 @@ from frappe.utils import get_files_path
 from frappe.utils.file_manager import save_file
 from frappe.utils import nowdate, nowtime, get_first_day, getdate
 from frappe.auth import LoginManager
+from salon.utils import tokens
 
 def log_error(title, error):
     frappe.log_error(frappe.get_traceback(), title)
@@ -222,7 +223,7 @@ def login(**kwargs):
 
         frappe.response["status"] = True
         frappe.response["message"] = "Login successful"
-        frappe.response["data"] = _login_user_to_dict(logged_user)
+        frappe.response["data"] = _login_user_to_dict(logged_user, tokens.issue_tokens(logged_user.name))
 
     except frappe.AuthenticationError:
         frappe.response["status"] = False
@@ -236,7 +237,8 @@ def login(**kwargs):
         frappe.response["data"] = {}
 
 
-def _login_user_to_dict(user):
+def _login_user_to_dict(user, api_tokens=None):
+    api_tokens = api_tokens or {}
     profile_image = ""
     if user.user_image:
         profile_image = frappe.utils.get_url(user.user_image)
@@ -249,7 +251,9 @@ def _login_user_to_dict(user):
         "email": user.email,
         "gender": user.gender or "",
         "user_role": [],
-        "api_token": "", 
+        "api_token": api_tokens.get("access_token", ""),
+        "refresh_token": api_tokens.get("refresh_token", ""),
+        "expires_in": api_tokens.get("expires_in", 0),
         "profile_image": profile_image,
         "login_type": user.bio or "",
     }
@@ -427,4 +431,54 @@ def _user_to_dict(user):
         "gender": getattr(user, "gender", "") or "",
         "loginType": getattr(user, "bio", ""),
         "profileImage": user.user_image or "",
-    }
\ No newline at end of file
+    }
+
+
+@frappe.whitelist(allow_guest=True, methods=["POST"])
+def refresh_access_token(refresh_token=None):
+    """Exchange a refresh token for a new access / refresh token pair."""
+    try:
+        new_tokens = tokens.refresh(refresh_token)
+        if not new_tokens:
+            frappe.response["status"] = False
+            frappe.response["message"] = "Invalid or expired refresh token"
+            frappe.response["data"] = {}
+            return
+
+        frappe.response["status"] = True
+        frappe.response["message"] = "Token refreshed"
+        frappe.response["data"] = {
+            "api_token": new_tokens["access_token"],
+            "refresh_token": new_tokens["refresh_token"],
+            "expires_in": new_tokens["expires_in"],
+        }
+
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Refresh Token Error")
+        frappe.response["status"] = False
+        frappe.response["message"] = f"Server Error: {str(e)}"
+        frappe.response["data"] = {}
+
+
+@frappe.whitelist(allow_guest=True, methods=["POST"])
+def revoke_token(refresh_token=None):
+    """Log out a token client: revoke the access token of this request and
+    the given refresh token."""
+    try:
+        for token, token_type in (
+            (frappe.get_request_header(tokens.HEADER), "access"),
+            (refresh_token, "refresh"),
+        ):
+            claims = tokens.decode(token, token_type) if token else None
+            if claims:
+                tokens.revoke(claims)
+
+        frappe.response["status"] = True
+        frappe.response["message"] = "Token revoked"
+        frappe.response["data"] = {}
+
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Revoke Token Error")
+        frappe.response["status"] = False
+        frappe.response["message"] = f"Server Error: {str(e)}"
+        frappe.response["data"] = {}
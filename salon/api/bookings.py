@@ -8,7 +8,13 @@ from frappe.utils import flt
 from frappe import _
 from frappe.utils import get_files_path
 from frappe.utils.file_manager import save_file
-from frappe.utils import nowdate, nowtime, get_first_day, getdate
+from frappe.utils import nowdate, nowtime, get_first_day, getdate, cint
+from frappe.query_builder import Order
+from salon.utils.service_cache import get_services
+from salon.utils.drivers import get_eligible_drivers
+from salon.utils import availability, dispatch, geo, slot_holds, work_calendar
+from salon.utils.manifest import get_manifest
+from salon.salon.doctype.booking.booking import SlotUnavailableError
 
 def log_error(title, error):
     frappe.log_error(frappe.get_traceback(), title)
@@ -21,6 +27,68 @@ def flatten(lis):
         else:        
             yield item
 
+BOOKING_FIELDS = [
+    "name as id",
+    "customer",
+    "state",
+    "state_name",
+    "location",
+    "staff_name",
+    "staff",
+    "date",
+    "slot",
+    "status",
+    "driver_note",
+    "payment_status",
+    "payment_reference",
+    "payment_method",
+    "cash_method",
+    "branch",
+    "note",
+    "total",
+    "is_gift",
+    "gift_to",
+    "gift_from",
+    "gift_location",
+    "gift_message",
+    "gift_number",
+]
+
+DEFAULT_PAGE_LENGTH = 20
+MAX_PAGE_LENGTH = 100
+
+
+def _page_length(limit):
+    limit = cint(limit) or DEFAULT_PAGE_LENGTH
+    return max(1, min(limit, MAX_PAGE_LENGTH))
+
+
+def encode_cursor(values):
+    raw = json.dumps([str(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise frappe.ValidationError("Invalid cursor")
+
+    return values
+
+
+def _booking_columns(table, fields):
+    columns = []
+    for f in fields:
+        field, _, alias = f.partition(" as ")
+        column = table[field]
+        columns.append(column.as_(alias) if alias else column)
+    return columns
+
 @frappe.whitelist(allow_guest=False)
 def get_states(id=None):
     try:
@@ -58,151 +126,335 @@ def get_available_driver(id=None, employee_id=None):
             })
             return
 
-        state_id = str(id)
-        emp_id = str(employee_id) if employee_id else None
+        available_drivers = [
+            {
+                "driver_id": d.name,
+                "driver_name": d.driver_name,
+                "user": d.user,
+                "device_token": d.device_token,
+            }
+            for d in get_eligible_drivers(id, employee_id)
+        ]
 
-        drivers = frappe.get_all(
-            "Drivers",
-            fields=["name", "driver_name", "user", "device_token"]
-        )
+        frappe.response.update({
+            "status": True,
+            "message": "Drivers fetched successfully",
+            "data": available_drivers
+        })
 
-        available_drivers = []
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Get Available Driver Error")
+        frappe.response.update({
+            "status": False,
+            "message": f"Server Error: {str(e)}",
+            "data": []
+        })
 
-        for d in drivers:
-            driver_doc = frappe.get_doc("Drivers", d.name)
+@frappe.whitelist(allow_guest=False)
+def get_nearest_drivers(booking_id=None, radius_km=None, limit=10):
+    """Drivers eligible for a booking (its state and staff), nearest first.
 
-            has_state = any(
-                state_id in [str(v) for v in row.as_dict().values()]
-                for row in driver_doc.get("states")
-            )
+    With `radius_km` only drivers inside the surrounding bounding box are
+    loaded; drivers without a known position are listed last.
+    """
+    try:
+        if not booking_id:
+            frappe.response.update({
+                "status": False,
+                "message": "Missing required parameter: booking_id",
+                "data": []
+            })
+            return
 
-            has_employee = True
-            if emp_id:
-                has_employee = any(
-                    emp_id in [str(v) for v in row.as_dict().values()]
-                    for row in driver_doc.get("staff")
-                )
+        booking = frappe.db.get_value(
+            "Booking", booking_id, ["state", "staff", "latitude", "longitude"], as_dict=True
+        )
+        if not booking:
+            frappe.response.update({
+                "status": False,
+                "message": "Booking not found",
+                "data": []
+            })
+            return
 
-            if has_state and has_employee:
-                available_drivers.append({
-                    "driver_id": d.name,
-                    "driver_name": d.driver_name,
-                    "user": d.user,
-                    "device_token": d.device_token,
-                })
+        located = geo.has_coordinates(booking.latitude, booking.longitude)
+        radius_km = flt(radius_km)
+        bounds = geo.bounding_box(booking.latitude, booking.longitude, radius_km) if located and radius_km else None
+
+        drivers = {d.name: d for d in get_eligible_drivers(booking.state, booking.staff, bounds)}
+
+        ranked = []
+        if located:
+            ranked = geo.rank_by_distance(
+                booking.latitude,
+                booking.longitude,
+                [
+                    (d.name, d.latitude, d.longitude)
+                    for d in drivers.values()
+                    if geo.has_coordinates(d.latitude, d.longitude)
+                ],
+            )
+            if radius_km:
+                ranked = [(name, km) for name, km in ranked if km <= radius_km]
+
+        ranked_names = {name for name, _ in ranked}
+        if not bounds:
+            ranked += [(name, None) for name in drivers if name not in ranked_names]
+
+        data = [
+            {
+                "driver_id": name,
+                "driver_name": drivers[name].driver_name,
+                "user": drivers[name].user,
+                "distance_km": round(km, 2) if km is not None else None,
+            }
+            for name, km in ranked[: cint(limit) or None]
+        ]
 
         frappe.response.update({
             "status": True,
             "message": "Drivers fetched successfully",
-            "data": available_drivers
+            "data": data
         })
 
     except Exception as e:
-        frappe.log_error(frappe.get_traceback(), "Get Available Driver Error")
+        frappe.log_error(frappe.get_traceback(), "Get Nearest Drivers Error")
         frappe.response.update({
             "status": False,
             "message": f"Server Error: {str(e)}",
             "data": []
         })
 
-@frappe.whitelist(allow_guest=True)
-def save_booking():
-    try:
-        raw_data = frappe.request.data
+@frappe.whitelist(allow_guest=False, methods=["POST"])
+def auto_dispatch(date=None, dry_run=1, max_per_slot=1):
+    """Assign drivers to all unassigned bookings of `date`.
 
-        if raw_data:
-            try:
-                if isinstance(raw_data, bytes):
-                    raw_data = raw_data.decode("utf-8")
-                data = json.loads(raw_data)
-            except Exception:
-                data = frappe.form_dict
-        else:
-            data = frappe.form_dict
+    With dry_run (the default) the plan is returned without writing anything;
+    otherwise it is recomputed and applied in a background job.
+    """
+    try:
+        frappe.only_for("System Manager")
 
-        if not data or not isinstance(data, dict):
+        if not date:
             frappe.response.update({
                 "status": False,
-                "message": "Invalid or empty request body",
-                "data": []
+                "message": "Missing required parameter: date",
+                "data": {}
             })
             return
 
-        doc = frappe.new_doc("Booking")
+        if cint(dry_run):
+            frappe.response.update({
+                "status": True,
+                "message": "Dispatch plan",
+                "data": dispatch.plan_dispatch(date, max_per_slot)
+            })
+            return
 
-        safe_fields = [
-            "customer", "state", "branch", "driver", "location",
-            "lat_lng", "staff", "date", "slot", "status",
-            "payment_status", "payment_reference", "payment_method",
-            "note", "is_gift", "gift_from", "gift_to",
-            "gift_message", "gift_location", "gift_number"
-        ]
+        job = frappe.enqueue(
+            "salon.utils.dispatch.dispatch_day",
+            queue="long",
+            job_id=f"salon_dispatch:{getdate(date)}",
+            deduplicate=True,
+            date=date,
+            max_per_slot=max_per_slot,
+            user=frappe.session.user,
+        )
 
-        for field in safe_fields:
-            if field in data:
-                doc.set(field, data[field])
+        frappe.response.update({
+            "status": True,
+            "message": "Dispatch queued",
+            "data": {"job_id": job.id if job else None}
+        })
 
-        gift_card = data.get("gift_card")
-        if gift_card:
-            try:
-                img_data = base64.b64decode(gift_card)
-                file_name = f"{frappe.generate_hash()}.png"
-                file_path = frappe.utils.get_site_path("public", "files", file_name)
-                with open(file_path, "wb") as f:
-                    f.write(img_data)
-                doc.gift_card = f"/files/{file_name}"
-            except Exception as e:
-                frappe.log_error(f"Gift card decode failed: {str(e)}")
-
-        total_amount = 0.0
-        services = data.get("table_services") or []
-
-        if not isinstance(services, list):
+    except frappe.PermissionError:
+        frappe.response.update({
+            "status": False,
+            "message": "Not permitted",
+            "data": {}
+        })
+
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Auto Dispatch Error")
+        frappe.response.update({
+            "status": False,
+            "message": f"Server Error: {str(e)}",
+            "data": {}
+        })
+
+def _get_request_data():
+    raw_data = frappe.request.data
+
+    if raw_data:
+        try:
+            if isinstance(raw_data, bytes):
+                raw_data = raw_data.decode("utf-8")
+            return json.loads(raw_data)
+        except Exception:
+            return frappe.form_dict
+
+    return frappe.form_dict
+
+
+def _build_booking(data):
+    doc = frappe.new_doc("Booking")
+
+    safe_fields = [
+        "customer", "state", "branch", "driver", "location",
+        "lat_lng", "staff", "date", "slot", "status",
+        "payment_status", "payment_reference", "payment_method",
+        "note", "is_gift", "gift_from", "gift_to",
+        "gift_message", "gift_location", "gift_number"
+    ]
+
+    for field in safe_fields:
+        if field in data:
+            doc.set(field, data[field])
+
+    gift_card = data.get("gift_card")
+    if gift_card:
+        try:
+            img_data = base64.b64decode(gift_card)
+            file_name = f"{frappe.generate_hash()}.png"
+            file_path = frappe.utils.get_site_path("public", "files", file_name)
+            with open(file_path, "wb") as f:
+                f.write(img_data)
+            doc.gift_card = f"/files/{file_name}"
+        except Exception as e:
+            frappe.log_error(f"Gift card decode failed: {str(e)}")
+
+    total_amount = 0.0
+    services = data.get("table_services") or []
+
+    if not isinstance(services, list):
+        raise frappe.ValidationError("Invalid data: table_services must be a list")
+
+    for s in services:
+        if not isinstance(s, dict):
+            continue
+
+        service_id = s.get("service")
+        qty = float(s.get("qty") or 1)
+        price = float(s.get("price") or 0)
+        total_price = qty * price
+        total_amount += total_price
+
+        doc.append("table_services", {
+            "service": service_id,
+            "qty": qty,
+            "price": price,
+            "total_price": total_price
+        })
+
+    doc.total = total_amount
+    return doc
+
+
+def _insert_booking(data, title):
+    """Insert a Booking in one transaction.
+
+    The unique `slot_key` column and the locked overlap check in
+    Booking.validate make the database settle concurrent attempts on the same
+    employee time: the losing insert fails and is reported as
+    "Slot not available". The Redis interval index rejects obvious conflicts
+    before any write.
+    """
+    try:
+        if not data or not isinstance(data, dict):
             frappe.response.update({
                 "status": False,
-                "message": "Invalid data: table_services must be a list",
+                "message": "Invalid or empty request body",
                 "data": []
             })
             return
 
-        for s in services:
-            if not isinstance(s, dict):
-                continue
+        doc = _build_booking(data)
+        hold_token = data.get("hold_token")
 
-            service_id = s.get("service")
-            qty = float(s.get("qty") or 1)
-            price = float(s.get("price") or 0)
-            total_price = qty * price
-            total_amount += total_price
-
-            doc.append("table_services", {
-                "service": service_id,
-                "qty": qty,
-                "price": price,
-                "total_price": total_price
+        if doc.staff and doc.date and doc.slot and (
+            not work_calendar.is_working(doc.staff, doc.date)
+            or slot_holds.is_held(doc.staff, doc.date, doc.slot, hold_token)
+            or not availability.is_slot_free(
+                doc.staff, doc.date, doc.slot, [row.service for row in doc.table_services if row.service]
+            )
+        ):
+            frappe.response.update({
+                "status": False,
+                "message": "Slot not available",
+                "data": []
             })
+            return
 
-        doc.total = total_amount
         doc.insert(ignore_permissions=True)
         frappe.db.commit()
 
+        if hold_token:
+            slot_holds.release_hold(doc.staff, doc.date, doc.slot, hold_token)
+
         frappe.response.update({
             "status": True,
             "message": "Booking saved successfully",
             "data": {"name": doc.name}
         })
 
+    except (frappe.UniqueValidationError, SlotUnavailableError, frappe.QueryDeadlockError):
+        frappe.db.rollback()
+        frappe.clear_messages()
+        frappe.response.update({
+            "status": False,
+            "message": "Slot not available",
+            "data": []
+        })
+
+    except frappe.ValidationError as e:
+        frappe.db.rollback()
+        frappe.response.update({
+            "status": False,
+            "message": str(e),
+            "data": []
+        })
+
     except Exception as e:
         frappe.db.rollback()
-        frappe.log_error(frappe.get_traceback(), "save_booking_error")
+        frappe.log_error(frappe.get_traceback(), title)
         frappe.response.update({
             "status": False,
             "message": f"Server Error: {str(e)}",
             "data": []
         })
 
+
 @frappe.whitelist(allow_guest=True)
-def booking_list(email=None, search=None):
+def save_booking():
+    _insert_booking(_get_request_data(), "save_booking_error")
+
+
+@frappe.whitelist(allow_guest=True)
+def reserve_booking():
+    """Reserve a staff/date/slot and create the Booking in a single call.
+
+    Replaces the verify_slot + save_booking round trips; a slot taken by a
+    concurrent request is rejected by the database, not by a prior check.
+    """
+    data = _get_request_data()
+
+    if isinstance(data, dict) and not (data.get("staff") and data.get("date") and data.get("slot")):
+        frappe.response.update({
+            "status": False,
+            "message": "staff, date and slot are required",
+            "data": []
+        })
+        return
+
+    _insert_booking(data, "reserve_booking_error")
+
+@frappe.whitelist(allow_guest=True)
+def booking_list(email=None, search=None, after=None, limit=None):
+    """Customer bookings, newest first.
+
+    Pages are keyed on (creation, name): pass the `next_cursor` of the previous
+    response as `after` to continue. Served by the (customer, creation) index.
+    """
     try:
         if not email:
             frappe.response["status"] = False
@@ -210,78 +462,46 @@ def booking_list(email=None, search=None):
             frappe.response["data"] = []
             return
 
-        filters = {"customer": email}
-        if search:
-            filters["name"] = ["like", f"%{search}%"]
-
-        bookings = frappe.get_all(
-            "Booking",
-            filters=filters,
-            fields=[
-                "name as id",
-                "customer",
-                "state",
-                "state_name",
-                "location",
-                "staff_name",
-                "staff",
-                "date",
-                "slot",
-                "status",
-                "driver_note",
-                "payment_status",
-                "payment_reference",
-                "payment_method",
-                "cash_method",
-                "branch",
-                "note",
-                "total",
-                "is_gift",
-                "gift_to",
-                "gift_from",
-                "gift_location",
-                "gift_message",
-                "gift_number",
-            ],
-            order_by="creation desc",
+        limit = _page_length(limit)
+        Booking = frappe.qb.DocType("Booking")
+
+        query = (
+            frappe.qb.from_(Booking)
+            .select(Booking.creation, *_booking_columns(Booking, BOOKING_FIELDS))
+            .where(Booking.customer == email)
+            .orderby(Booking.creation, order=Order.desc)
+            .orderby(Booking.name, order=Order.desc)
+            .limit(limit + 1)
         )
 
-        result = []
-        for b in bookings:
-            result.append({
-                "id": b.id or "",
-                "branch": b.branch or "",
-                "branch_name": frappe.get_value("Branches", b.branch, "name1") or "",
-                "staff_name": b.staff_name or "",
-                "staff": b.staff or "",
-                "note": b.note or "",
-                "date": str(b.date) if b.date else "",
-                "slot": b.slot or "",
-                "slot_time": frappe.get_value("Time Slot", b.slot, "service_time") or "",
-                "state": b.state or "",
-                "state_name": b.state_name or "",
-                "location": b.location or "",
-                "status": b.status or "",
-                "driver_note": b.driver_note or "",
-                "customer": b.customer or "",
-                "total": b.total or 0,
-                "payment_status": b.payment_status or "",
-                "payment_reference": b.payment_reference or "",
-                "payment_method": b.payment_method or "",
-                "cash_method": b.cash_method or "",
-                "is_gift": b.is_gift or 0,
-                "gift_to": b.gift_to or "",
-                "gift_from": b.gift_from or "",
-                "gift_location": b.gift_location or "",
-                "gift_message": b.gift_message or "",
-                "gift_number": b.gift_number or "",
-                "table_services": get_booking_services(b.id),
-                "phone" : frappe.db.get_value("User", b.customer, "mobile_no") or "",
-            })
+        if search:
+            query = query.where(Booking.name.like(f"%{search}%"))
+
+        if after:
+            creation, name = decode_cursor(after, 2)
+            query = query.where(Booking.creation <= creation).where(
+                (Booking.creation < creation) | (Booking.name < cint(name))
+            )
+
+        bookings = query.run(as_dict=True)
+
+        next_cursor = None
+        if len(bookings) > limit:
+            bookings = bookings[:limit]
+            last = bookings[-1]
+            next_cursor = encode_cursor([last.creation, last.id])
+
+        result = hydrate_bookings(bookings)
 
         frappe.response["status"] = True
         frappe.response["message"] = "Booking list fetched successfully"
         frappe.response["data"] = result
+        frappe.response["next_cursor"] = next_cursor
+
+    except frappe.ValidationError as e:
+        frappe.response["status"] = False
+        frappe.response["message"] = str(e)
+        frappe.response["data"] = []
 
     except Exception as e:
         frappe.log_error(frappe.get_traceback(), "booking_list API Error")
@@ -292,40 +512,138 @@ def booking_list(email=None, search=None):
 
 
 def get_booking_services(booking_id):
+    return get_services_for_bookings([booking_id]).get(str(booking_id), [])
+
+
+def get_services_for_bookings(booking_ids):
+    """Return {booking_id: [service rows]} for all given bookings.
+
+    Line items come from one query; Service metadata from the service cache.
+    """
     try:
+        booking_ids = [b for b in booking_ids if b]
+        if not booking_ids:
+            return {}
+
         site_url = frappe.utils.get_url()
 
-        services = frappe.get_all(
+        items = frappe.get_all(
             "Booking Items List",
-            filters={"parent": booking_id},
-            fields=["service", "qty", "price"]
+            filters={"parent": ["in", booking_ids], "parenttype": "Booking"},
+            fields=["parent", "service", "qty", "price"],
+            order_by="idx asc",
         )
 
-        result = []
-        for s in services:
-            service_doc = frappe.get_doc("Service", s.service)
-
-            result.append({
-                "id": service_doc.name,
-                "name": service_doc.english_name or "",
-                "name_ar": service_doc.arabic_name or "",
-                "description_en": service_doc.english_description or "",
-                "description_ar": service_doc.arabic_description or "",
-                "duration_min": service_doc.duration or 0,
-                "default_price": s.price or service_doc.price or 0,
-                "category_id": service_doc.category if hasattr(service_doc, 'category') else None,
-                "sub_category_id": service_doc.subcategory if hasattr(service_doc, 'subcategory') else None,
-                "status": service_doc.status if hasattr(service_doc, 'status') else "active",
-                "service_image": site_url + service_doc.image if service_doc.image else None,
-                "is_gift_category": service_doc.gift if hasattr(service_doc, 'gift') else 0,
-                "service_amount": s.qty or 1,
+        services = get_services([i.service for i in items])
+
+        result = {}
+        for i in items:
+            service = services.get(str(i.service))
+            if not service:
+                continue
+
+            result.setdefault(str(i.parent), []).append({
+                "id": service.name,
+                "name": service.english_name or "",
+                "name_ar": service.arabic_name or "",
+                "description_en": service.english_description or "",
+                "description_ar": service.arabic_description or "",
+                "duration_min": service.duration or 0,
+                "default_price": i.price or service.price or 0,
+                "category_id": service.category,
+                "sub_category_id": service.subcategory,
+                "status": "active",
+                "service_image": site_url + service.image if service.image else None,
+                "is_gift_category": service.gift or 0,
+                "service_amount": i.qty or 1,
             })
 
         return result
     except Exception as e:
         frappe.log_error(frappe.get_traceback(), "get_booking_services Error")
+        return {}
+
+
+def _get_value_map(doctype, names, fields):
+    names = list({n for n in names if n})
+    if not names:
+        return {}
+
+    rows = frappe.get_all(
+        doctype,
+        filters={"name": ["in", names]},
+        fields=["name"] + fields,
+    )
+    return {str(r.name): r for r in rows}
+
+
+def hydrate_bookings(bookings, driver_view=False):
+    """Serialize Booking rows for the API.
+
+    Linked Branches, Time Slot, States, User and Service records are collected
+    from the whole page and fetched with one query per doctype, so the number of
+    queries does not grow with the number of bookings.
+    """
+    if not bookings:
         return []
 
+    branches = _get_value_map("Branches", [b.branch for b in bookings], ["name1"])
+    slots = _get_value_map("Time Slot", [b.slot for b in bookings], ["service_time"])
+    users = _get_value_map("User", [b.customer for b in bookings], ["mobile_no", "full_name"])
+    states = _get_value_map("States", [b.state for b in bookings], ["state_name_ar"]) if driver_view else {}
+    services = get_services_for_bookings([b.id for b in bookings])
+
+    result = []
+    for b in bookings:
+        branch = branches.get(str(b.branch)) or {}
+        slot = slots.get(str(b.slot)) or {}
+        user = users.get(str(b.customer)) or {}
+
+        row = {
+            "id": b.id or "",
+            "branch": b.branch or "",
+            "branch_name": branch.get("name1") or "",
+            "staff_name": b.staff_name or "",
+            "staff": b.staff or "",
+            "note": b.note or "",
+            "date": str(b.date) if b.date else "",
+            "slot": b.slot or "",
+            "slot_time": slot.get("service_time") or "",
+            "state": b.state or "",
+            "state_name": b.state_name or "",
+            "location": b.location or "",
+            "status": b.status or "",
+            "driver_note": b.driver_note or "",
+            "customer": b.customer or "",
+            "total": b.total or 0,
+            "payment_status": b.payment_status or "",
+            "payment_reference": b.payment_reference or "",
+            "payment_method": b.payment_method or "",
+            "cash_method": b.cash_method or "",
+            "is_gift": b.is_gift or 0,
+            "gift_to": b.gift_to or "",
+            "gift_from": b.gift_from or "",
+            "gift_location": b.gift_location or "",
+            "gift_message": b.gift_message or "",
+            "gift_number": b.gift_number or "",
+            "table_services": services.get(str(b.id), []),
+            "phone": user.get("mobile_no") or "",
+        }
+
+        if driver_view:
+            row["state_name_ar"] = (states.get(str(b.state)) or {}).get("state_name_ar") or ""
+            row["customer_name"] = user.get("full_name") or ""
+            if b.is_quick_booking == 1:
+                row["phone"] = b.customer_phone_qb
+            row["lat_lng"] = b.lat_lng
+            located = geo.has_coordinates(b.latitude, b.longitude)
+            row["latitude"] = b.latitude if located else None
+            row["longitude"] = b.longitude if located else None
+
+        result.append(row)
+
+    return result
+
 @frappe.whitelist(allow_guest=True)
 def booking_detail(id=None):
     try:
@@ -335,37 +653,7 @@ def booking_detail(id=None):
             frappe.response["data"] = {}
             return
 
-        booking = frappe.db.get_value(
-            "Booking",
-            id,
-            [
-                "name as id",
-                "customer",
-                "state",
-                "state_name",
-                "location",
-                "staff_name",
-                "staff",
-                "date",
-                "slot",
-                "status",
-                "driver_note",
-                "payment_status",
-                "payment_reference",
-                "payment_method",
-                "cash_method",
-                "branch",
-                "note",
-                "total",
-                "is_gift",
-                "gift_to",
-                "gift_from",
-                "gift_location",
-                "gift_message",
-                "gift_number",
-            ],
-            as_dict=True,
-        )
+        booking = frappe.db.get_value("Booking", id, BOOKING_FIELDS, as_dict=True)
 
         if not booking:
             frappe.response["status"] = False
@@ -373,36 +661,7 @@ def booking_detail(id=None):
             frappe.response["data"] = {}
             return
 
-        data = {
-            "id": booking.id or "",
-            "branch": booking.branch or "",
-            "branch_name": frappe.get_value("Branches", booking.branch, "name1") or "",
-            "staff_name": booking.staff_name or "",
-            "staff": booking.staff or "",
-            "note": booking.note or "",
-            "date": str(booking.date) if booking.date else "",
-            "slot": booking.slot or "",
-            "slot_time": frappe.get_value("Time Slot", booking.slot, "service_time") or "",
-            "state": booking.state or "",
-            "state_name": booking.state_name or "",
-            "location": booking.location or "",
-            "status": booking.status or "",
-            "driver_note": booking.driver_note or "",
-            "customer": booking.customer or "",
-            "total": booking.total or 0,
-            "payment_status": booking.payment_status or "",
-            "payment_reference": booking.payment_reference or "",
-            "payment_method": booking.payment_method or "",
-            "cash_method": booking.cash_method or "",
-            "is_gift": booking.is_gift or 0,
-            "gift_to": booking.gift_to or "",
-            "gift_from": booking.gift_from or "",
-            "gift_location": booking.gift_location or "",
-            "gift_message": booking.gift_message or "",
-            "gift_number": booking.gift_number or "",
-            "table_services": get_booking_services(booking.id),
-            "phone": frappe.db.get_value("User", booking.customer, "mobile_no") or "",
-        }
+        data = hydrate_bookings([booking])[0]
 
         frappe.response["status"] = True
         frappe.response["message"] = "Booking detail fetched successfully"
@@ -499,7 +758,12 @@ def update_booking():
         frappe.response["data"] = {}
 
 @frappe.whitelist(allow_guest=True)
-def driver_booking_list(id=None, search=None):
+def driver_booking_list(id=None, search=None, after=None, limit=None):
+    """Upcoming bookings of a driver ordered by (date, slot, name).
+
+    Pass the `next_cursor` of the previous response as `after` to continue.
+    Served by the (driver, date, slot) index.
+    """
     try:
         if not id:
             frappe.response["status"] = False
@@ -515,91 +779,86 @@ def driver_booking_list(id=None, search=None):
             return
 
         today = frappe.utils.today()
-
-        filters = {
-            "driver": id,
-            "status": ["!=", "Cancel"],
-            "date": [">=", today],
-        }
+        limit = _page_length(limit)
+        Booking = frappe.qb.DocType("Booking")
+
+        query = (
+            frappe.qb.from_(Booking)
+            .select(
+                *_booking_columns(
+                    Booking, BOOKING_FIELDS + ["lat_lng", "latitude", "longitude", "is_quick_booking", "customer_phone_qb"]
+                )
+            )
+            .where(Booking.driver == id)
+            .where(Booking.status != "Cancel")
+            .where(Booking.date >= today)
+            .orderby(Booking.date)
+            .orderby(Booking.slot)
+            .orderby(Booking.name)
+            .limit(limit + 1)
+        )
 
         if search:
-            filters["name"] = ["like", f"%{search}%"]
-
-        bookings = frappe.get_all(
-            "Booking",
-            filters=filters,
-            fields=[
-                "name as id",
-                "customer",
-                "state",
-                "state_name",
-                "location",
-                "staff_name",
-                "staff",
-                "date",
-                "slot",
-                "status",
-                "driver_note",
-                "payment_status",
-                "payment_reference",
-                "payment_method",
-                "cash_method",
-                "branch",
-                "note",
-                "total",
-                "is_gift",
-                "gift_to",
-                "gift_from",
-                "gift_location",
-                "gift_message",
-                "gift_number",
-                "lat_lng",
-            ],
-            order_by="date asc, slot asc",
-        )
+            query = query.where(Booking.name.like(f"%{search}%"))
 
-        result = []
-        for b in bookings:
-            result.append({
-                "id": b.id or "",
-                "branch": b.branch or "",
-                "branch_name": frappe.get_value("Branches", b.branch, "name1") or "",
-                "staff_name": b.staff_name or "",
-                "staff": b.staff or "",
-                "note": b.note or "",
-                "date": str(b.date) if b.date else "",
-                "slot": b.slot or "",
-                "slot_time": frappe.get_value("Time Slot", b.slot, "service_time") or "",
-                "state": b.state or "",
-                "state_name": b.state_name or "",
-                "state_name_ar": frappe.get_value("States", b.state, "state_name_ar") or "",
-                "location": b.location or "",
-                "status": b.status or "",
-                "driver_note": b.driver_note or "",
-                "customer": b.customer or "",
-                "customer_name": frappe.get_value("User", b.customer, "full_name") or "",
-                "total": b.total or 0,
-                "payment_status": b.payment_status or "",
-                "payment_reference": b.payment_reference or "",
-                "payment_method": b.payment_method or "",
-                "cash_method": b.cash_method or "",
-                "is_gift": b.is_gift or 0,
-                "gift_to": b.gift_to or "",
-                "gift_from": b.gift_from or "",
-                "gift_location": b.gift_location or "",
-                "gift_message": b.gift_message or "",
-                "gift_number": b.gift_number or "",
-                "table_services": get_booking_services(b.id),
-                "phone": b.customer_phone_qb if b.is_quick_booking == 1 else frappe.db.get_value("User", b.customer, "mobile_no") or "",
-                "lat_lng": b.lat_lng,
-            })
+        if after:
+            date, slot, name = decode_cursor(after, 3)
+            # legacy bookings without a slot sort first within their day (NULL
+            # first); compared on the bare column so the index keeps the order
+            if slot == "":
+                same_day = Booking.slot.isnotnull() | (Booking.slot.isnull() & (Booking.name > cint(name)))
+            else:
+                same_day = (Booking.slot > cint(slot)) | ((Booking.slot == cint(slot)) & (Booking.name > cint(name)))
+            query = query.where(Booking.date >= date).where((Booking.date > date) | same_day)
+
+        bookings = query.run(as_dict=True)
+
+        next_cursor = None
+        if len(bookings) > limit:
+            bookings = bookings[:limit]
+            last = bookings[-1]
+            next_cursor = encode_cursor([last.date, "" if last.slot is None else last.slot, last.id])
+
+        result = hydrate_bookings(bookings, driver_view=True)
 
         frappe.response["status"] = True
         frappe.response["message"] = "Driver booking list fetched successfully"
         frappe.response["data"] = result
+        frappe.response["next_cursor"] = next_cursor
+
+    except frappe.ValidationError as e:
+        frappe.response["status"] = False
+        frappe.response["message"] = str(e)
+        frappe.response["data"] = []
 
     except Exception as e:
         frappe.log_error(frappe.get_traceback(), "driver_booking_list API Error")
         frappe.response["status"] = False
         frappe.response["message"] = f"Server Error: {str(e)}"
         frappe.response["data"] = []
+
+@frappe.whitelist(allow_guest=False)
+def driver_manifest(id=None, date=None):
+    """One day of a driver's bookings as compact stops in driving order."""
+    try:
+        if not id:
+            frappe.response["status"] = False
+            frappe.response["message"] = "Driver ID is required"
+            frappe.response["data"] = {}
+            return
+
+        if not frappe.db.exists("Drivers", id):
+            frappe.response["status"] = False
+            frappe.response["message"] = "Driver not found"
+            frappe.response["data"] = {}
+            return
+
+        frappe.response["status"] = True
+        frappe.response["message"] = "Driver manifest fetched successfully"
+        frappe.response["data"] = get_manifest(id, date or frappe.utils.today())
+
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "driver_manifest API Error")
+        frappe.response["status"] = False
+        frappe.response["message"] = f"Server Error: {str(e)}"
+        frappe.response["data"] = {}
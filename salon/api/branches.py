@@ -9,6 +9,8 @@ from frappe import _
 from frappe.utils import get_files_path
 from frappe.utils.file_manager import save_file
 from frappe.utils import nowdate, nowtime, get_first_day, getdate
+from salon.utils.catalog import get_snapshot, not_modified
+from salon.utils.images import get_image_url
 
 def log_error(title, error):
     frappe.log_error(frappe.get_traceback(), title)
@@ -22,27 +24,17 @@ def flatten(lis):
             yield item
 
 @frappe.whitelist(allow_guest=True)
-def branch_list(per_page=100, page=1):
+def branch_list(per_page=100, page=1, size=None):
     try:
         per_page = int(per_page)
         page = int(page)
         start = (page - 1) * per_page
 
-        filters = {"disabled": 0}
+        snapshot = get_snapshot()
+        if not_modified(snapshot["etag"]):
+            return
 
-        branches = frappe.get_all(
-            "Branches",
-            filters=filters,
-            fields=[
-                "name as id",
-                "name1 as name",
-                "branch_for",
-                "contact_number",
-                "image as branch_image"
-            ],
-            limit_start=start,
-            limit_page_length=per_page
-        )
+        branches = snapshot["data"]["branches"][start:start + per_page]
 
         data = []
         for b in branches:
@@ -51,7 +43,7 @@ def branch_list(per_page=100, page=1):
                 "name": b.name,
                 "branch_for": b.branch_for or "",
                 "contact_number": b.contact_number or "",
-                "branch_image": frappe.utils.get_url(b.branch_image) if b.branch_image else "",
+                "branch_image": frappe.utils.get_url(get_image_url(b.branch_image, size)) if b.branch_image else "",
                 "rating_star": 5,
                 "total_review": 0,
                 "address_line_1": "",
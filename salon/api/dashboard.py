@@ -9,6 +9,8 @@ from frappe import _
 from frappe.utils import get_files_path
 from frappe.utils.file_manager import save_file
 from frappe.utils import nowdate, nowtime, get_first_day, getdate
+from salon.utils.catalog import get_snapshot, not_modified
+from salon.utils.images import get_image_url
 
 def log_error(title, error):
     frappe.log_error(frappe.get_traceback(), title)
@@ -22,28 +24,24 @@ def flatten(lis):
             yield item
 
 @frappe.whitelist(allow_guest=True, methods=["GET"])
-def dashboard_detail():
+def dashboard_detail(size=None):
     try:
+        snapshot = get_snapshot()
+        if not_modified(snapshot["etag"]):
+            return
+
         site_url = frappe.utils.get_url()
 
-        sliders = frappe.get_all(
-            "Slider",
-            filters={"disabled": 0},
-            fields=["name", "slider_name", "image"]
-        )
+        sliders = snapshot["data"]["sliders"]
 
         slider_list = []
         for s in sliders:
             slider_list.append({
                 "name": s.slider_name or "",
-                "slider_image": f"{site_url}{s.image}" if s.image else ""
+                "slider_image": f"{site_url}{get_image_url(s.image, size)}" if s.image else ""
             })
 
-        categories = frappe.get_all(
-            "Categories",
-            filters={"disable": 0, "is_group": 1},
-            fields=["name", "name_english", "name_arabic", "is_group", "image"]
-        )
+        categories = [c for c in snapshot["data"]["categories"] if c.is_group]
 
         category_list = []
         for c in categories:
@@ -53,7 +51,7 @@ def dashboard_detail():
                 "name_arabic": c.name_arabic or "",
                 "parent_id": None,
                 "status": 1,
-                "category_image": f"{site_url}{c.image}" if c.image else "",
+                "category_image": f"{site_url}{get_image_url(c.image, size)}" if c.image else "",
                 "is_gift": 0
             })
 
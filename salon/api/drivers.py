@@ -10,6 +10,7 @@ from frappe.utils import get_files_path
 from frappe.utils.file_manager import save_file
 from frappe.utils import nowdate, nowtime, get_first_day, getdate
 from frappe.auth import LoginManager
+from salon.utils import driver_location, tokens
 
 def log_error(title, error):
     frappe.log_error(frappe.get_traceback(), title)
@@ -50,6 +51,8 @@ def driver_login(email=None, password=None, device_token=None):
             frappe.db.set_value("Drivers", driver.name, "device_token", device_token)
             frappe.db.commit()
 
+        api_tokens = tokens.issue_tokens(user.name)
+
         data = {
             "id": driver.name,
             "first_name": user.first_name or "",
@@ -59,7 +62,10 @@ def driver_login(email=None, password=None, device_token=None):
             "device_token": device_token or driver.device_token or "",
             "gender": user.gender or "",
             "profile_image":  f"{site_url}{user.user_image}" if user.user_image else "",
-            "login_type": "driver"
+            "login_type": "driver",
+            "api_token": api_tokens["access_token"],
+            "refresh_token": api_tokens["refresh_token"],
+            "expires_in": api_tokens["expires_in"],
         }
 
         frappe.response["status"] = True
@@ -125,3 +131,72 @@ def get_driver(id=None):
         frappe.response["status"] = False
         frappe.response["message"] = f"Server Error: {str(e)}"
         frappe.response["data"] = {}
+
+
+@frappe.whitelist(allow_guest=False, methods=["POST"])
+def update_location(id=None, latitude=None, longitude=None, pings=None):
+    """Record the driver's position: one ping (latitude, longitude) or a
+    batch in `pings` ([{lat, lng, ts, accuracy, speed, heading}])."""
+    try:
+        if not id:
+            frappe.response["status"] = False
+            frappe.response["message"] = "Driver ID is required"
+            frappe.response["data"] = {}
+            return
+
+        driver_user = frappe.get_cached_value("Drivers", id, "user")
+        if driver_user != frappe.session.user and "System Manager" not in frappe.get_roles():
+            frappe.response["status"] = False
+            frappe.response["message"] = "Not permitted"
+            frappe.response["data"] = {}
+            return
+
+        if pings:
+            pings = frappe.parse_json(pings) if isinstance(pings, str) else pings
+        else:
+            pings = [{"lat": latitude, "lng": longitude}]
+
+        if not isinstance(pings, list):
+            frappe.response["status"] = False
+            frappe.response["message"] = "pings must be a list"
+            frappe.response["data"] = {}
+            return
+
+        accepted = driver_location.record_pings(id, [p for p in pings if isinstance(p, dict)])
+
+        frappe.response["status"] = True
+        frappe.response["message"] = "Location recorded"
+        frappe.response["data"] = {"accepted": accepted}
+
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "update_location API Error")
+        frappe.response["status"] = False
+        frappe.response["message"] = f"Server Error: {str(e)}"
+        frappe.response["data"] = {}
+
+
+@frappe.whitelist(allow_guest=False)
+def get_driver_positions(ids=None):
+    """Last known position of the given drivers (comma separated), or of all."""
+    try:
+        frappe.only_for(["System Manager", "Sales Manager", "Sales User"])
+
+        drivers = [i.strip() for i in (ids or "").split(",") if i.strip()]
+
+        frappe.response["status"] = True
+        frappe.response["message"] = "Driver positions fetched successfully"
+        frappe.response["data"] = [
+            {"driver_id": name, "latitude": p["lat"], "longitude": p["lng"], "timestamp": p["ts"]}
+            for name, p in driver_location.get_last_positions(drivers).items()
+        ]
+
+    except frappe.PermissionError:
+        frappe.response["status"] = False
+        frappe.response["message"] = "Not permitted"
+        frappe.response["data"] = []
+
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "get_driver_positions API Error")
+        frappe.response["status"] = False
+        frappe.response["message"] = f"Server Error: {str(e)}"
+        frappe.response["data"] = []
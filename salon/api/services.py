@@ -8,7 +8,12 @@ from frappe.utils import flt
 from frappe import _
 from frappe.utils import get_files_path
 from frappe.utils.file_manager import save_file
-from frappe.utils import nowdate, nowtime, get_first_day, getdate
+from frappe.utils import nowdate, nowtime, get_first_day, getdate, cint
+from frappe.query_builder import Order
+from salon.utils.service_search import search_services
+from salon.utils.catalog import get_snapshot, not_modified
+from salon.utils.category_tree import build_tree, get_rows, get_service_counts
+from salon.utils.images import get_image_url
 
 def log_error(title, error):
     frappe.log_error(frappe.get_traceback(), title)
@@ -21,16 +26,19 @@ def flatten(lis):
         else:        
             yield item
 
+MAX_SEARCH_RESULTS = 500
+MAX_PAGE_LENGTH = 100
+
 @frappe.whitelist(allow_guest=True, methods=["GET"])
-def category_list():
+def category_list(size=None):
     try:
+        snapshot = get_snapshot()
+        if not_modified(snapshot["etag"]):
+            return
+
         site_url = frappe.utils.get_url()
 
-        categories = frappe.get_all(
-            "Categories",
-            filters={"disable": 0, "is_group": 1},
-            fields=["name", "name_english", "name_arabic", "is_group", "image", "parent_categories"]
-        ) 
+        categories = [c for c in snapshot["data"]["categories"] if c.is_group]
 
         category_list = []
         for c in categories:
@@ -40,7 +48,7 @@ def category_list():
                 "name_arabic": c.name_arabic or "",
                 "parent_id": None,
                 "status": 1,
-                "category_image": f"{site_url}{c.image}" if c.image else "",
+                "category_image": f"{site_url}{get_image_url(c.image, size)}" if c.image else "",
                 "is_gift": 0
             })
 
@@ -55,15 +63,18 @@ def category_list():
         frappe.response["data"] = {}   
 
 @frappe.whitelist(allow_guest=True, methods=["GET"])
-def subcategory_list(parent_id=0):
+def subcategory_list(parent_id=0, size=None):
     try:
+        snapshot = get_snapshot()
+        if not_modified(snapshot["etag"]):
+            return
+
         site_url = frappe.utils.get_url()
 
-        categories = frappe.get_all(
-            "Categories",
-            filters={"disable": 0, "is_group": 0, "parent_categories": parent_id},
-            fields=["name", "name_english", "name_arabic", "is_group", "image", "parent_categories"]
-        )
+        categories = [
+            c for c in snapshot["data"]["categories"]
+            if not c.is_group and str(c.parent_categories) == str(parent_id)
+        ]
 
         category_list = []
         for c in categories:
@@ -73,7 +84,7 @@ def subcategory_list(parent_id=0):
                 "name_arabic": c.name_arabic or "",
                 "parent_id": c.parent_categories or None,
                 "status": 1,
-                "category_image": f"{site_url}{c.image}" if c.image else "",
+                "category_image": f"{site_url}{get_image_url(c.image, size)}" if c.image else "",
                 "is_gift": 0
             })
 
@@ -87,57 +98,126 @@ def subcategory_list(parent_id=0):
         frappe.response["message"] = f"Server Error: {str(e)}"
         frappe.response["data"] = {} 
 
+@frappe.whitelist(allow_guest=True, methods=["GET"])
+def category_tree(with_counts=0, size=None):
+    """All enabled categories nested under their parents, in one call."""
+    try:
+        if not_modified(get_snapshot()["etag"]):
+            return
+
+        site_url = frappe.utils.get_url()
+
+        def make_node(c):
+            return {
+                "id": c.name,
+                "name": c.name_english or "",
+                "name_arabic": c.name_arabic or "",
+                "parent_id": c.parent_categories or None,
+                "status": 1,
+                "category_image": f"{site_url}{get_image_url(c.image, size)}" if c.image else "",
+                "is_gift": 0
+            }
+
+        counts = get_service_counts() if cint(with_counts) else None
+
+        frappe.response["status"] = True
+        frappe.response["message"] = "Category tree fetched successfully"
+        frappe.response["data"] = build_tree(get_rows(), make_node, counts)
+
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Category Tree Error")
+        frappe.response["status"] = False
+        frappe.response["message"] = f"Server Error: {str(e)}"
+        frappe.response["data"] = []
+
 
 @frappe.whitelist(allow_guest=True)
-def service_list(category_id=None, subcategory_id=None, search=None, branch_id=None):
+def service_list(category_id=None, subcategory_id=None, search=None, branch_id=None, per_page=None, page=None, size=None):
+    """Enabled services, newest first (best match first when searching),
+    filtered in one query.
+
+    Paged only when `per_page` or `page` is given (at most MAX_PAGE_LENGTH per
+    page, `has_more` tells whether another page follows); without them every
+    service is returned, as before paging existed.
+    """
     try:
+        if not_modified(get_snapshot()["etag"]):
+            return
+
         site_url = frappe.utils.get_url()
-        
-        services = frappe.get_all(
-            "Service",
-            fields=[
-                "name",
-                "english_name",
-                "arabic_name",
-                "english_description",
-                "arabic_description",
-                "price",
-                "duration",
-                "category",
-                "subcategory",
-                "image",
-                "disabled",
-                "gift"
-            ],
-            filters={"disabled": 0},
-            order_by="creation desc"
-        )
 
-        filtered_services = []
+        paged = bool(cint(per_page) or cint(page))
+        if paged:
+            per_page = min(cint(per_page) or MAX_PAGE_LENGTH, MAX_PAGE_LENGTH)
+            start = (max(cint(page), 1) - 1) * per_page
+
+        Service = frappe.qb.DocType("Service")
+        query = (
+            frappe.qb.from_(Service)
+            .select(
+                Service.name,
+                Service.english_name,
+                Service.arabic_name,
+                Service.english_description,
+                Service.arabic_description,
+                Service.price,
+                Service.duration,
+                Service.category,
+                Service.subcategory,
+                Service.image,
+                Service.gift,
+            )
+            .where(Service.disabled == 0)
+        )
 
-        for s in services:
-            if branch_id:
-                branch_links = frappe.get_all(
-                    "Branches",
-                    filters={"parent": s.name},
-                    fields=["branch"]
+        ranked = None
+        if search:
+            # ranked by the search index, so filtered and paged after ordering
+            ranked = search_services(search, limit=MAX_SEARCH_RESULTS)
+            if not ranked:
+                frappe.response["status"] = True
+                frappe.response["message"] = "service list fetched successfully"
+                frappe.response["data"] = []
+                if paged:
+                    frappe.response["has_more"] = False
+                return
+            query = query.where(Service.name.isin(ranked))
+        else:
+            query = query.orderby(Service.creation, order=Order.desc).orderby(Service.name, order=Order.desc)
+            if paged:
+                # one extra row tells whether another page follows
+                query = query.limit(per_page + 1).offset(start)
+
+        if branch_id:
+            ServiceBranch = frappe.qb.DocType("Branches table")
+            query = query.where(
+                Service.name.isin(
+                    frappe.qb.from_(ServiceBranch)
+                    .select(ServiceBranch.parent)
+                    .where(ServiceBranch.parenttype == "Service")
+                    .where(ServiceBranch.branches == branch_id)
                 )
-                branch_ids = [b.branch for b in branch_links]
+            )
 
-                if branch_id not in branch_ids:
-                    continue
+        if category_id:
+            query = query.where(Service.category == category_id)
+        if subcategory_id:
+            query = query.where(Service.subcategory == subcategory_id)
 
-            if category_id and s.get("category") != category_id:
-                continue
-            if subcategory_id and s.get("subcategory") != subcategory_id:
-                continue
+        services = query.run(as_dict=True)
+        if ranked:
+            rank = {name: i for i, name in enumerate(ranked)}
+            services.sort(key=lambda s: rank.get(str(s.name), len(rank)))
+            if paged:
+                services = services[start : start + per_page + 1]
 
-            if search:
-                term = search.lower()
-                if term not in (s.get("english_name") or "").lower() and \
-                   term not in (s.get("arabic_name") or "").lower():
-                    continue
+        has_more = False
+        if paged and len(services) > per_page:
+            has_more = True
+            services = services[:per_page]
 
+        filtered_services = []
+        for s in services:
             filtered_services.append({
                 "id": s.get("name"),
                 "name": s.get("english_name"),
@@ -149,13 +229,15 @@ def service_list(category_id=None, subcategory_id=None, search=None, branch_id=N
                 "category_id": s.get("category"),
                 "status": "active",
                 "sub_category_id": s.get("subcategory"),
-                "service_image": f"{site_url}{s['image']}" if s.get("image") else None,
+                "service_image": f"{site_url}{get_image_url(s['image'], size)}" if s.get("image") else None,
                 "is_gift_category": s.get("gift")
             })
 
         frappe.response["status"] = True
         frappe.response["message"] = "service list fetched successfully"
         frappe.response["data"] = filtered_services
+        if paged:
+            frappe.response["has_more"] = has_more
 
     except Exception as e:
         frappe.log_error(frappe.get_traceback(), "Service List Error")
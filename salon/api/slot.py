@@ -8,7 +8,11 @@ from frappe.utils import flt
 from frappe import _
 from frappe.utils import get_files_path
 from frappe.utils.file_manager import save_file
-from frappe.utils import nowdate, nowtime, get_first_day, getdate
+from frappe.utils import nowdate, nowtime, get_first_day, getdate, add_days, date_diff
+from salon.utils import availability, slot_holds
+from salon.utils.eligibility import get_eligible_employees
+from salon.utils.slots import get_all_slots, get_branch_slots, get_slots
+from salon.utils import work_calendar
 
 def log_error(title, error):
     frappe.log_error(frappe.get_traceback(), title)
@@ -21,6 +25,14 @@ def flatten(lis):
         else:        
             yield item
 
+MAX_MATRIX_DAYS = 31
+
+
+def _parse_ids(ids):
+    if isinstance(ids, str):
+        return [i.strip() for i in ids.split(",") if i.strip()]
+    return ids or []
+
 
 @frappe.whitelist(allow_guest=True)
 def get_branch_configuration(branch_id=None, employee_id=None):
@@ -31,53 +43,22 @@ def get_branch_configuration(branch_id=None, employee_id=None):
             frappe.response["data"] = []
             return
 
-        branch_doc = frappe.get_doc("Branches", branch_id)
-
-      
-        slot_ids = [row.time_slot for row in getattr(branch_doc, "slot_time", []) if row.time_slot]
+        slots = get_branch_slots(branch_id)
 
-        if not slot_ids:
+        if not slots:
             frappe.response["status"] = True
             frappe.response["message"] = "No time slots found for this branch"
             frappe.response["data"] = []
             return
 
-        slots = frappe.get_all(
-            "Time Slot",
-            filters={"name": ["in", slot_ids], "disable": 0},
-            fields=["name as id", "service_time as start_time", "duration"]
-        )
-
         slot_data = []
         for s in slots:
-            start = s.get("start_time")
-            duration = s.get("duration") or 0
-            end = None
-            try:
-                if start:
-                    start_str = str(start)
-                    time_parts = start_str.split(":")
-                    if len(time_parts) >= 2:
-                        hours = int(time_parts[0])
-                        minutes = int(time_parts[1])
-                        total_minutes = hours * 60 + minutes + duration
-                        end_hour = (total_minutes // 60) % 24
-                        end_minute = total_minutes % 60
-                        end = f"{end_hour:02d}:{end_minute:02d}:00"
-                    else:
-                        end = ""
-                else:
-                    end = ""
-            except Exception as e:
-                frappe.log_error(f"Time parse error: {e}", "Branch Slot Time Calc")
-                end = ""
-
             slot_data.append({
                 "branch_id": branch_id,
-                "id": s.get("id"),
-                "start_time": start,
-                "end_time": end,
-                "duration": duration,
+                "id": s.id,
+                "start_time": s.start_time,
+                "end_time": s.end_time,
+                "duration": s.duration,
                 "is_available": True
             })
 
@@ -105,62 +86,34 @@ def get_bookings_by_date():
             frappe.response["data"] = []
             return
 
-        bookings = frappe.get_all(
-            "Booking",
-            filters={
-                "staff": employee_id,
-                "date": date,
-                "status": ["!=", "Cancel"]
-            },
-            fields=["slot", "branch"]
-        )
+        if not work_calendar.is_working(employee_id, date):
+            # off-day: every slot is unavailable
+            if data.get("branch_id"):
+                booked_slots = [s.id for s in get_branch_slots(data.get("branch_id"))]
+            else:
+                booked_slots = list(get_all_slots())
+            held_slots = []
+        else:
+            booked_slots = availability.get_booked_slots(employee_id, date)
+            held_slots = slot_holds.get_held_slots(employee_id, date, data.get("hold_token"))
 
-        if not bookings:
+        if not booked_slots and not held_slots:
             frappe.response["status"] = True
             frappe.response["message"] = "No booked slots found"
             frappe.response["data"] = []
             return
 
-        slot_ids = [b.slot for b in bookings if b.slot]
+        slot_ids = list(set(booked_slots) | set(held_slots))
 
 
-        slots = frappe.get_all(
-            "Time Slot",
-            filters={"name": ["in", slot_ids]},
-            fields=["name", "service_time", "duration"]
-        )
-
         data_list = []
-        for s in slots:
-            start = s.service_time
-            duration = s.duration or 0
-            end = ""
-
-            try:
-                if start:
-                    start_str = str(start)
-                    time_parts = start_str.split(":")
-                    if len(time_parts) >= 2:
-                        hours = int(time_parts[0])
-                        minutes = int(time_parts[1])
-                        total_minutes = hours * 60 + minutes + duration
-                        end_hour = (total_minutes // 60) % 24
-                        end_minute = total_minutes % 60
-                        end = f"{end_hour:02d}:{end_minute:02d}:00"
-                    else:
-                        end = ""
-                else:
-                    end = ""
-            except Exception as e:
-                frappe.log_error(f"Time parse error: {e}", "Branch Slot Time Calc")
-                end = ""
-
+        for s in get_slots(slot_ids).values():
             data_list.append({
-                "branch_id": str(bookings[0].branch) if bookings else "",
-                "id": s.name,
-                "start_time": start,
-                "end_time": end,
-                "duration": duration,
+                "branch_id": str(data.get("branch_id") or ""),
+                "id": s.id,
+                "start_time": s.start_time,
+                "end_time": s.end_time,
+                "duration": s.duration,
                 "is_available": False
             })
 
@@ -188,14 +141,10 @@ def verify_slot():
             frappe.response["data"] = False
             return
 
-        exists = frappe.db.exists(
-            "Booking",
-            {
-                "staff": employee_id,
-                "date": date,
-                "slot": slot_id,
-                "status": ["!=", "Cancel"],
-            },
+        exists = (
+            not work_calendar.is_working(employee_id, date)
+            or slot_holds.is_held(employee_id, date, slot_id, data.get("hold_token"))
+            or not availability.is_slot_free(employee_id, date, slot_id, _parse_ids(data.get("service_ids")))
         )
 
         if exists:
@@ -212,3 +161,208 @@ def verify_slot():
         frappe.response["status"] = False
         frappe.response["message"] = f"Server Error: {str(e)}"
         frappe.response["data"] = False
+
+
+@frappe.whitelist(allow_guest=False)
+def hold_slot():
+    """Place a TTL hold on a staff/date/slot while the customer checks out.
+
+    Returns a `hold_token`; pass it to renew_slot_hold, release_slot_hold,
+    verify_slot and save_booking. The hold expires on its own after `ttl`
+    seconds (default 300, max 900).
+    """
+    try:
+        data = frappe.local.form_dict
+        employee_id = data.get("employee_id")
+        date = data.get("date")
+        slot_id = data.get("slot_id")
+
+        if not employee_id or not date or not slot_id:
+            frappe.response["status"] = False
+            frappe.response["message"] = "Missing required parameters"
+            frappe.response["data"] = {}
+            return
+
+        booked = not work_calendar.is_working(employee_id, date) or not availability.is_slot_free(
+            employee_id, date, slot_id, _parse_ids(data.get("service_ids"))
+        )
+
+        token = None if booked else slot_holds.place_hold(employee_id, date, slot_id, data.get("ttl"))
+
+        if not token:
+            frappe.response["status"] = False
+            frappe.response["message"] = "Slot not available"
+            frappe.response["data"] = {}
+            return
+
+        frappe.response["status"] = True
+        frappe.response["message"] = "Slot held successfully"
+        frappe.response["data"] = {
+            "hold_token": token,
+            "expires_in": slot_holds.get_hold_ttl(data.get("ttl")),
+        }
+
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Hold Slot Error")
+        frappe.response["status"] = False
+        frappe.response["message"] = f"Server Error: {str(e)}"
+        frappe.response["data"] = {}
+
+
+@frappe.whitelist(allow_guest=False)
+def renew_slot_hold():
+    try:
+        data = frappe.local.form_dict
+        employee_id = data.get("employee_id")
+        date = data.get("date")
+        slot_id = data.get("slot_id")
+        token = data.get("hold_token")
+
+        if not employee_id or not date or not slot_id or not token:
+            frappe.response["status"] = False
+            frappe.response["message"] = "Missing required parameters"
+            frappe.response["data"] = {}
+            return
+
+        if not slot_holds.renew_hold(employee_id, date, slot_id, token, data.get("ttl")):
+            frappe.response["status"] = False
+            frappe.response["message"] = "Hold expired or not found"
+            frappe.response["data"] = {}
+            return
+
+        frappe.response["status"] = True
+        frappe.response["message"] = "Hold renewed successfully"
+        frappe.response["data"] = {
+            "hold_token": token,
+            "expires_in": slot_holds.get_hold_ttl(data.get("ttl")),
+        }
+
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Renew Slot Hold Error")
+        frappe.response["status"] = False
+        frappe.response["message"] = f"Server Error: {str(e)}"
+        frappe.response["data"] = {}
+
+
+@frappe.whitelist(allow_guest=False)
+def release_slot_hold():
+    try:
+        data = frappe.local.form_dict
+        employee_id = data.get("employee_id")
+        date = data.get("date")
+        slot_id = data.get("slot_id")
+        token = data.get("hold_token")
+
+        if not employee_id or not date or not slot_id or not token:
+            frappe.response["status"] = False
+            frappe.response["message"] = "Missing required parameters"
+            frappe.response["data"] = False
+            return
+
+        released = slot_holds.release_hold(employee_id, date, slot_id, token)
+
+        frappe.response["status"] = True
+        frappe.response["message"] = "Hold released" if released else "Hold expired or not found"
+        frappe.response["data"] = released
+
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Release Slot Hold Error")
+        frappe.response["status"] = False
+        frappe.response["message"] = f"Server Error: {str(e)}"
+        frappe.response["data"] = False
+
+
+@frappe.whitelist(allow_guest=True)
+def get_availability_matrix(branch_id=None, from_date=None, to_date=None, service_ids=None):
+    """Free slots of every eligible employee of a branch over a date range.
+
+    Each employee carries one bitmap string per date in `dates`, with one
+    character per entry of `slots`: "1" when a booking of the requested
+    services (or of the slot's own length) starting there fits, "0" when it
+    would overlap an existing booking or falls on one of the employee's
+    off-days. Built from the branch slot table, the cached working calendars
+    and a single grouped Booking query.
+    """
+    try:
+        if not branch_id or not from_date:
+            frappe.response["status"] = False
+            frappe.response["message"] = "branch_id and from_date are required"
+            frappe.response["data"] = {}
+            return
+
+        start = getdate(from_date)
+        end = getdate(to_date or from_date)
+        days = date_diff(end, start) + 1
+
+        if days < 1 or days > MAX_MATRIX_DAYS:
+            frappe.response["status"] = False
+            frappe.response["message"] = f"Invalid date range (max {MAX_MATRIX_DAYS} days)"
+            frappe.response["data"] = {}
+            return
+
+        dates = [add_days(start, i) for i in range(days)]
+
+        slots = get_branch_slots(branch_id)
+
+        service_ids = _parse_ids(service_ids)
+
+        employees = get_eligible_employees(branch_id, service_ids, fields=["employee_name"])
+
+        day_bookings = {}
+        if employees and slots:
+            Booking = frappe.qb.DocType("Booking")
+            rows = (
+                frappe.qb.from_(Booking)
+                .select(Booking.staff, Booking.date, Booking.slot, Booking.start_minute, Booking.end_minute)
+                .where(Booking.staff.isin([e.name for e in employees]))
+                .where(Booking.date.between(start, end))
+                .where(Booking.status != "Cancel")
+                .where(Booking.docstatus < 2)
+                .groupby(Booking.staff, Booking.date, Booking.slot, Booking.start_minute, Booking.end_minute)
+                .run(as_dict=True)
+            )
+            for r in rows:
+                day_bookings.setdefault((str(r.staff), str(r.date)), []).append(r)
+
+        duration = availability.get_services_duration(service_ids)
+        windows = [(s.start_minute, s.start_minute + (duration or s.end_minute - s.start_minute)) for s in slots]
+        empty_day = availability.IntervalIndex()
+        calendars = work_calendar.get_calendars([e.name for e in employees])
+
+        slot_list = [
+            {"id": s.id, "start_time": s.start_time, "end_time": s.end_time, "duration": s.duration}
+            for s in slots
+        ]
+
+        employee_list = []
+        for e in employees:
+            bitmaps = []
+            for d in dates:
+                if work_calendar.is_off(calendars[str(e.name)], d):
+                    bitmaps.append("0" * len(windows))
+                    continue
+
+                bookings = day_bookings.get((str(e.name), str(d)))
+                index = availability.IntervalIndex(availability.booking_intervals(bookings)) if bookings else empty_day
+                bitmaps.append("".join("1" if index.is_free(ws, we) else "0" for ws, we in windows))
+
+            employee_list.append({
+                "id": e.name,
+                "full_name": e.employee_name or "",
+                "availability": bitmaps,
+            })
+
+        frappe.response["status"] = True
+        frappe.response["message"] = "Availability fetched successfully"
+        frappe.response["data"] = {
+            "branch_id": branch_id,
+            "dates": [str(d) for d in dates],
+            "slots": slot_list,
+            "employees": employee_list,
+        }
+
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Get Availability Matrix Error")
+        frappe.response["status"] = False
+        frappe.response["message"] = f"Server Error: {str(e)}"
+        frappe.response["data"] = {}
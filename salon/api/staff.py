@@ -10,6 +10,12 @@ from frappe.utils import get_files_path
 from frappe.utils.file_manager import save_file
 from frappe.utils import nowdate, nowtime, get_first_day, getdate
 from frappe.query_builder import Field
+from salon.utils.service_search import search_services
+from salon.utils.images import get_image_url
+from salon.utils.eligibility import get_eligible_employees
+from salon.utils import availability, slot_holds
+from salon.utils.slots import get_branch_slots
+from salon.utils.work_calendar import get_calendars, is_off
 
 def log_error(title, error):
     frappe.log_error(frappe.get_traceback(), title)
@@ -23,101 +29,159 @@ def flatten(lis):
             yield item
 
 @frappe.whitelist(allow_guest=True)
-def get_employee_list(branch_id=None, service_ids=None):
+def get_employee_list(branch_id=None, service_ids=None, size=None):
     try:
         site_url = frappe.utils.get_url()
 
-        branch_employees = None
-        if branch_id:
-            if frappe.db.exists("Branches", branch_id):
-                branch_doc = frappe.get_doc("Branches", branch_id)
-                branch_employees = {
-                    (row.employee or "").strip() for row in getattr(branch_doc, "staff", []) if (row.employee or "").strip()
-                }
-            else:
-                branch_employees = set()
-
-        employees_in_all_services = None
         service_list = [s.strip() for s in (service_ids or "").split(",") if s.strip()]
         if service_list:
+            existing = set(frappe.get_all("Service", filters={"name": ["in", service_list]}, pluck="name"))
+            resolved = []
             for sid in service_list:
-                if not frappe.db.exists("Service", sid):
-                    matches = frappe.get_all("Service", filters=[["english_name", "like", f"%{sid}%"]], limit_page_length=1)
-                    if matches:
-                        sid_use = matches[0].name
-                    else:
-                        continue
-                else:
-                    sid_use = sid
-
-                service_doc = frappe.get_doc("Service", sid_use)
-                staff_set = {
-                    (row.employee or "").strip() for row in getattr(service_doc, "staff", []) if (row.employee or "").strip()
-                }
-
-                if employees_in_all_services is None:
-                    employees_in_all_services = staff_set
+                if sid in existing:
+                    resolved.append(sid)
                 else:
-                    employees_in_all_services &= staff_set
-
-            if employees_in_all_services is None:
-                employees_in_all_services = set()
-
-        if branch_employees is not None and employees_in_all_services is not None:
+                    matches = search_services(sid, limit=1)
+                    if matches:
+                        resolved.append(matches[0])
+
+            if not resolved:
+                frappe.response["status"] = True
+                frappe.response["message"] = "list fetched successfully"
+                frappe.response["data"] = []
+                return
+            service_list = resolved
+
+        employees = get_eligible_employees(
+            branch_id,
+            service_list,
+            fields=[
+                "first_name", "last_name", "employee_name",
+                "user_id", "cell_number", "date_of_birth",
+                "gender", "date_of_joining", "image", "custom_holidays"
+            ],
+        )
 
-            valid_employees = branch_employees & employees_in_all_services
-        elif branch_employees is not None:
+        user_ids = [emp.user_id for emp in employees if emp.user_id]
+        emails = dict(
+            frappe.get_all("User", filters={"name": ["in", user_ids]}, fields=["name", "email"], as_list=True)
+        ) if user_ids else {}
 
-            valid_employees = branch_employees
-        elif employees_in_all_services is not None:
+        data = []
+        for emp in employees:
+            data.append({
+                "id": emp.get("name"),
+                "first_name": emp.get("first_name") or "",
+                "last_name": emp.get("last_name") or "",
+                "full_name": emp.get("employee_name") or "",
+                "email": emails.get(emp.get("user_id")) if emp.get("user_id") else None,
+                "mobile": emp.get("cell_number") or "",
+                "gender": emp.get("gender") or "",
+                "date_of_birth": emp.get("date_of_birth"),
+                "joining_date": emp.get("date_of_joining"),
+                "profile_image": f"{site_url}{get_image_url(emp.get('image'), size)}" if emp.get("image") else "",
+                "holiday": emp.get("custom_holidays") or "",
+                "status": 1,
+                "rating_star": 5,
+            })
 
-            valid_employees = employees_in_all_services
-        else:
+        frappe.response["status"] = True
+        frappe.response["message"] = "list fetched successfully"
+        frappe.response["data"] = data
 
-            all_active = frappe.get_all("Employee", filters={"status": "Active"}, pluck="name")
-            valid_employees = set(all_active or [])
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "get_employee_list Error")
+        frappe.response["status"] = False
+        frappe.response["message"] = f"Server Error: {str(e)}"
+        frappe.response["data"] = []
 
 
-        if not valid_employees:
-            frappe.response["status"] = True
-            frappe.response["message"] = "list fetched successfully"
+@frappe.whitelist(allow_guest=True)
+def get_free_employees(branch_id=None, service_ids=None, date=None, slot=None, size=None):
+    """Employees of a branch who can perform every service and are free on
+    `date`: at `slot` when given, otherwise with their free slot ids."""
+    try:
+        if not branch_id or not date:
+            frappe.response["status"] = False
+            frappe.response["message"] = "branch_id and date are required"
             frappe.response["data"] = []
             return
 
-        employees = frappe.get_all(
-            "Employee",
-            filters={"name": ["in", list(valid_employees)], "status": "Active"},
+        site_url = frappe.utils.get_url()
+        date = getdate(date)
+        service_list = [s.strip() for s in (service_ids or "").split(",") if s.strip()]
+
+        employees = get_eligible_employees(
+            branch_id,
+            service_list,
             fields=[
-                "name", "first_name", "last_name", "employee_name",
-                "user_id", "cell_number", "date_of_birth",
-                "gender", "date_of_joining", "image", "custom_holidays"
+                "first_name", "last_name", "employee_name", "cell_number",
+                "gender", "image", "custom_holidays"
             ],
         )
+        calendars = get_calendars([emp.name for emp in employees])
+        employees = [emp for emp in employees if not is_off(calendars[str(emp.name)], date)]
+
+        if slot:
+            windows = {str(slot): availability.get_booking_interval(slot, service_list)}
+        else:
+            duration = availability.get_services_duration(service_list)
+            windows = {
+                str(s.id): (s.start_minute, s.start_minute + (duration or s.end_minute - s.start_minute))
+                for s in get_branch_slots(branch_id)
+            }
+        windows = {k: w for k, w in windows.items() if w}
+
+        day_bookings = {}
+        if employees and windows:
+            Booking = frappe.qb.DocType("Booking")
+            rows = (
+                frappe.qb.from_(Booking)
+                .select(Booking.staff, Booking.slot, Booking.start_minute, Booking.end_minute)
+                .where(Booking.staff.isin([emp.name for emp in employees]))
+                .where(Booking.date == date)
+                .where(Booking.status != "Cancel")
+                .where(Booking.docstatus < 2)
+                .run(as_dict=True)
+            )
+            for r in rows:
+                day_bookings.setdefault(str(r.staff), []).append(r)
 
         data = []
         for emp in employees:
-            data.append({
+            bookings = day_bookings.get(str(emp.name))
+            index = availability.IntervalIndex(availability.booking_intervals(bookings)) if bookings else None
+            held = set(slot_holds.get_held_slots(emp.name, date))
+
+            free_slots = [
+                slot_id for slot_id, (start, end) in windows.items()
+                if slot_id not in held and (index is None or index.is_free(start, end))
+            ]
+            if not free_slots:
+                continue
+
+            row = {
                 "id": emp.get("name"),
                 "first_name": emp.get("first_name") or "",
                 "last_name": emp.get("last_name") or "",
                 "full_name": emp.get("employee_name") or "",
-                "email": frappe.db.get_value("User", emp.get("user_id"), "email") if emp.get("user_id") else None,
                 "mobile": emp.get("cell_number") or "",
                 "gender": emp.get("gender") or "",
-                "date_of_birth": emp.get("date_of_birth"),
-                "joining_date": emp.get("date_of_joining"),
-                "profile_image": f"{site_url}{emp.get('image')}" if emp.get("image") else "",
+                "profile_image": f"{site_url}{get_image_url(emp.get('image'), size)}" if emp.get("image") else "",
                 "holiday": emp.get("custom_holidays") or "",
                 "status": 1,
                 "rating_star": 5,
-            })
+            }
+            if not slot:
+                row["free_slots"] = free_slots
+            data.append(row)
 
         frappe.response["status"] = True
         frappe.response["message"] = "list fetched successfully"
         frappe.response["data"] = data
 
     except Exception as e:
-        frappe.log_error(frappe.get_traceback(), "get_employee_list Error")
+        frappe.log_error(frappe.get_traceback(), "get_free_employees Error")
         frappe.response["status"] = False
         frappe.response["message"] = f"Server Error: {str(e)}"
-        frappe.response["data"] = []
\ No newline at end of file
+        frappe.response["data"] = []
@@ -137,17 +137,96 @@ app_license = "mit"
 # ---------------
 # Hook on document methods and events
 
-# doc_events = {
-# 	"*": {
-# 		"on_update": "method",
-# 		"on_cancel": "method",
-# 		"on_trash": "method"
-# 	}
-# }
+doc_events = {
+	"Booking": {
+		"after_insert": "salon.utils.availability.on_booking_change",
+		"on_update": [
+			"salon.utils.availability.on_booking_change",
+			"salon.utils.notifications.on_booking_change",
+			"salon.utils.manifest.on_booking_change",
+		],
+		"on_update_after_submit": "salon.utils.manifest.on_booking_change",
+		"on_cancel": [
+			"salon.utils.availability.on_booking_change",
+			"salon.utils.manifest.on_booking_change",
+		],
+		"on_trash": [
+			"salon.utils.availability.on_booking_change",
+			"salon.utils.manifest.on_booking_change",
+		],
+	},
+	"Service": {
+		"on_update": [
+			"salon.utils.service_cache.invalidate",
+			"salon.utils.service_search.update_service",
+			"salon.utils.catalog.invalidate",
+			"salon.utils.category_tree.clear_count_cache",
+		],
+		"on_trash": [
+			"salon.utils.service_cache.invalidate",
+			"salon.utils.service_search.remove_service",
+			"salon.utils.catalog.invalidate",
+			"salon.utils.category_tree.clear_count_cache",
+		],
+	},
+	"Time Slot": {
+		"on_update": "salon.utils.slots.clear_slot_cache",
+		"on_trash": "salon.utils.slots.clear_slot_cache",
+	},
+	"Branches": {
+		"on_update": [
+			"salon.utils.slots.clear_branch_slot_cache",
+			"salon.utils.catalog.invalidate",
+		],
+		"on_trash": [
+			"salon.utils.slots.clear_branch_slot_cache",
+			"salon.utils.catalog.invalidate",
+		],
+	},
+	"Categories": {
+		"on_update": [
+			"salon.utils.catalog.invalidate",
+			"salon.utils.category_tree.clear_tree_cache",
+		],
+		"on_trash": [
+			"salon.utils.catalog.invalidate",
+			"salon.utils.category_tree.clear_tree_cache",
+		],
+	},
+	"Slider": {
+		"on_update": "salon.utils.catalog.invalidate",
+		"on_trash": "salon.utils.catalog.invalidate",
+	},
+	"Employee": {
+		"on_update": "salon.utils.work_calendar.clear_employee_calendar",
+		"on_trash": "salon.utils.work_calendar.clear_employee_calendar",
+	},
+	"Holiday List": {
+		"on_update": "salon.utils.work_calendar.clear_calendars",
+		"on_trash": "salon.utils.work_calendar.clear_calendars",
+	},
+	"File": {
+		"after_insert": "salon.utils.images.on_file_insert",
+	},
+}
 
 # Scheduled Tasks
 # ---------------
 
+scheduler_events = {
+	"all": [
+		"salon.utils.notifications.dispatch",
+	],
+	"cron": {
+		"* * * * *": [
+			"salon.utils.driver_location.flush",
+		],
+	},
+	"daily": [
+		"salon.utils.driver_location.purge_old_locations",
+	],
+}
+
 # scheduler_events = {
 # 	"all": [
 # 		"salon.tasks.all"
@@ -197,7 +276,7 @@ app_license = "mit"
 # Request Events
 # ----------------
 # before_request = ["salon.utils.before_request"]
-# after_request = ["salon.utils.after_request"]
+after_request = ["salon.utils.catalog.set_etag"]
 
 # Job Events
 # ----------
@@ -231,9 +310,9 @@ app_license = "mit"
 # Authentication and authorization
 # --------------------------------
 
-# auth_hooks = [
-# 	"salon.auth.validate"
-# ]
+auth_hooks = [
+	"salon.utils.tokens.authenticate"
+]
 
 # Automatically update python controller files with type annotations for this app.
 # export_python_type_annotations = True
@@ -0,0 +1,9 @@
+import frappe
+
+
+def execute():
+    """Cancelled (docstatus 2) bookings must not hold a slot_key."""
+    Booking = frappe.qb.DocType("Booking")
+    frappe.qb.update(Booking).set(Booking.slot_key, None).where(Booking.docstatus == 2).where(
+        Booking.slot_key.isnotnull()
+    ).run()
@@ -0,0 +1,18 @@
+import frappe
+
+from salon.utils.geo import parse_lat_lng
+
+
+def execute():
+    """Parse lat_lng of existing bookings into latitude / longitude."""
+    bookings = frappe.get_all("Booking", filters={"lat_lng": ["is", "set"]}, fields=["name", "lat_lng"])
+
+    for b in bookings:
+        coordinates = parse_lat_lng(b.lat_lng)
+        if coordinates:
+            frappe.db.set_value(
+                "Booking",
+                b.name,
+                {"latitude": coordinates[0], "longitude": coordinates[1]},
+                update_modified=False,
+            )
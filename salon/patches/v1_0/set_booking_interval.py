@@ -0,0 +1,33 @@
+import frappe
+from frappe.utils import today
+
+from salon.utils.availability import get_booking_interval
+
+
+def execute():
+    """Record start/end minutes on upcoming active bookings."""
+    bookings = frappe.get_all(
+        "Booking",
+        filters={"status": ["!=", "Cancel"], "date": [">=", today()]},
+        fields=["name", "slot"],
+    )
+    if not bookings:
+        return
+
+    services = {}
+    for item in frappe.get_all(
+        "Booking Items List",
+        filters={"parenttype": "Booking", "parent": ["in", [b.name for b in bookings]]},
+        fields=["parent", "service"],
+    ):
+        services.setdefault(str(item.parent), []).append(item.service)
+
+    for b in bookings:
+        interval = get_booking_interval(b.slot, services.get(str(b.name), [])) if b.slot else None
+        if interval:
+            frappe.db.set_value(
+                "Booking",
+                b.name,
+                {"start_minute": interval[0], "end_minute": interval[1]},
+                update_modified=False,
+            )
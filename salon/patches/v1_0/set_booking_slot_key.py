@@ -0,0 +1,25 @@
+import frappe
+
+
+def execute():
+    """Backfill Booking.slot_key; when legacy data already double-books a slot,
+    only the earliest booking keeps the key."""
+    seen = set()
+
+    bookings = frappe.get_all(
+        "Booking",
+        filters={"status": ["!=", "Cancel"], "docstatus": ["<", 2]},
+        fields=["name", "staff", "date", "slot"],
+        order_by="creation asc",
+    )
+
+    for b in bookings:
+        if not (b.staff and b.date and b.slot):
+            continue
+
+        key = f"{b.staff}|{b.date}|{b.slot}"
+        if key in seen:
+            continue
+
+        seen.add(key)
+        frappe.db.set_value("Booking", b.name, "slot_key", key, update_modified=False)
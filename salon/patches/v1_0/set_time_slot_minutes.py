@@ -0,0 +1,13 @@
+import frappe
+
+from salon.utils.slots import SLOTS_KEY, get_slot_minutes
+
+
+def execute():
+    for slot in frappe.get_all("Time Slot", fields=["name", "service_time", "duration"]):
+        start, end = get_slot_minutes(slot.service_time, slot.duration)
+        frappe.db.set_value(
+            "Time Slot", slot.name, {"start_minute": start, "end_minute": end}, update_modified=False
+        )
+
+    frappe.cache().delete_value(SLOTS_KEY)
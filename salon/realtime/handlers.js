@@ -0,0 +1,20 @@
+// Socket handlers for the salon app.
+// Availability deltas are published on one room per branch and date
+// (see salon/utils/realtime.py); slot occupancy is not private, so any
+// connected client may follow a room.
+
+function availability_room(branch, date) {
+	return `salon_availability:${branch}:${date}`;
+}
+
+module.exports = function (socket) {
+	socket.on("salon_availability_subscribe", (branch, date) => {
+		if (!branch || !date) return;
+		socket.join(availability_room(branch, date));
+	});
+
+	socket.on("salon_availability_unsubscribe", (branch, date) => {
+		if (!branch || !date) return;
+		socket.leave(availability_room(branch, date));
+	});
+};
@@ -1,13 +1,69 @@
 import frappe
+from frappe import _
 from frappe.model.document import Document
+from frappe.utils import getdate
+
+from salon.utils.availability import IntervalIndex, booking_intervals, get_booking_interval, get_day_bookings
+from salon.utils.geo import parse_lat_lng
+
+
+class SlotUnavailableError(frappe.ValidationError):
+    pass
+
 
 class Booking(Document):
     def validate(self):
         self.calculate_total()
+        self.set_slot_key()
+        self.set_interval()
+        self.validate_overlap()
+        self.set_coordinates()
+
+    def on_cancel(self):
+        # Cancel skips validate; free the slot so the booking can be amended
+        self.db_set("slot_key", None, update_modified=False)
 
     def calculate_total(self):
         total = 0
         for row in self.table_services:
             row.total_price = (row.qty or 0) * (row.price or 0)
             total += row.total_price
-        self.total = total
\ No newline at end of file
+        self.total = total
+
+    def set_slot_key(self):
+        # unique column: active bookings cannot share (staff, date, slot)
+        if self.staff and self.date and self.slot and self.status != "Cancel":
+            self.slot_key = f"{self.staff}|{getdate(self.date)}|{self.slot}"
+        else:
+            self.slot_key = None
+
+    def set_interval(self):
+        interval = None
+        if self.slot:
+            interval = get_booking_interval(self.slot, [row.service for row in self.table_services if row.service])
+        self.start_minute, self.end_minute = interval or (0, 0)
+
+    def validate_overlap(self):
+        if self.status == "Cancel" or not (self.staff and self.date) or self.end_minute <= self.start_minute:
+            return
+
+        if not self.is_new() and not any(
+            self.has_value_changed(f) for f in ("staff", "date", "status", "start_minute", "end_minute")
+        ):
+            return
+
+        # FOR UPDATE locks the employee's day until commit, so overlapping
+        # concurrent bookings are settled by the database
+        bookings = get_day_bookings(self.staff, self.date, exclude=self.name, for_update=True)
+        if not IntervalIndex(booking_intervals(bookings)).is_free(self.start_minute, self.end_minute):
+            frappe.throw(_("Slot not available"), SlotUnavailableError)
+
+    def set_coordinates(self):
+        self.latitude, self.longitude = parse_lat_lng(self.lat_lng) or (None, None)
+
+
+def on_doctype_update():
+    frappe.db.add_index("Booking", ["customer", "creation"])
+    frappe.db.add_index("Booking", ["driver", "date", "slot"])
+    frappe.db.add_index("Booking", ["staff", "date"])
+    frappe.db.add_index("Booking", ["latitude", "longitude"])
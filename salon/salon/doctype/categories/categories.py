@@ -1,8 +1,12 @@
 # Copyright (c) 2025, ITQAN and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.utils.nestedset import NestedSet
 
 class Categories(NestedSet):
 	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Categories", ["lft", "rgt"])
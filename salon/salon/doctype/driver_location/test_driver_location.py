@@ -0,0 +1,38 @@
+# Copyright (c) 2025, ITQAN and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from salon.utils import driver_location
+
+
+class TestDriverLocation(FrappeTestCase):
+	def setUp(self):
+		frappe.cache().delete_value(driver_location.BUFFER_KEY)
+		self.driver = frappe.get_doc({"doctype": "Drivers", "driver_name": "_Test Location Driver"}).insert()
+
+	def tearDown(self):
+		# flush commits, so its rows are not undone by the test rollback
+		frappe.db.delete("Driver Location", {"driver": self.driver.name})
+		frappe.delete_doc("Drivers", self.driver.name, force=True)
+		frappe.db.commit()
+		frappe.cache().delete_value(driver_location.BUFFER_KEY)
+
+	def test_flush_writes_buffered_pings(self):
+		accepted = driver_location.record_pings(self.driver.name, [{"lat": 30.0444, "lng": 31.2357}])
+		self.assertEqual(accepted, 1)
+
+		driver_location.flush()
+
+		rows = frappe.get_all(
+			"Driver Location",
+			filters={"driver": self.driver.name},
+			fields=["name", "latitude", "longitude"],
+		)
+		self.assertEqual(len(rows), 1)
+		self.assertAlmostEqual(rows[0].latitude, 30.0444)
+		self.assertAlmostEqual(rows[0].longitude, 31.2357)
+		self.assertEqual(frappe.cache().llen(frappe.cache().make_key(driver_location.BUFFER_KEY)), 0)
+
+		self.assertAlmostEqual(frappe.db.get_value("Drivers", self.driver.name, "latitude"), 30.0444)
@@ -1,9 +1,13 @@
 # Copyright (c) 2025, ITQAN and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class Drivers(Document):
 	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Drivers", ["latitude", "longitude"])
@@ -0,0 +1,8 @@
+// Copyright (c) 2025, ITQAN and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on('Notification Outbox', {
+	// refresh: function(frm) {
+
+	// }
+});
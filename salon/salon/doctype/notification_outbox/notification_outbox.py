@@ -0,0 +1,13 @@
+# Copyright (c) 2025, ITQAN and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class NotificationOutbox(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Notification Outbox", ["status", "device_token"])
@@ -0,0 +1,62 @@
+# Copyright (c) 2025, ITQAN and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from salon.utils import notifications
+
+DEVICE_TOKEN = "_test_outbox_device"
+
+
+class TestNotificationOutbox(FrappeTestCase):
+	def setUp(self):
+		frappe.flags.salon_local_transport = None
+		frappe.db.delete("Notification Outbox", {"device_token": DEVICE_TOKEN})
+
+	def tearDown(self):
+		# dispatch commits, so its rows are not undone by the test rollback
+		frappe.db.delete("Notification Outbox", {"device_token": DEVICE_TOKEN})
+		frappe.db.commit()
+		frappe.flags.salon_local_transport = None
+
+	def get_statuses(self):
+		return frappe.get_all(
+			"Notification Outbox",
+			filters={"device_token": DEVICE_TOKEN},
+			fields=["title", "status", "attempts"],
+			order_by="name asc",
+		)
+
+	def test_notify_is_queued(self):
+		notifications.notify(DEVICE_TOKEN, "Hello", "First message")
+
+		(row,) = self.get_statuses()
+		self.assertEqual(row.status, "Queued")
+		self.assertEqual(row.attempts, 0)
+
+	def test_dispatch_sends_queued(self):
+		notifications.notify(DEVICE_TOKEN, "Hello", "First message", data={"booking_id": 1})
+		notifications.dispatch()
+
+		self.assertEqual([r.status for r in self.get_statuses()], ["Sent"])
+
+		transport = notifications.get_transport()
+		self.assertEqual(len(transport.sent), 1)
+		device_token, messages = transport.sent[0]
+		self.assertEqual(device_token, DEVICE_TOKEN)
+		self.assertEqual(messages, [{"title": "Hello", "body": "First message", "data": {"booking_id": 1}}])
+
+	def test_dispatch_coalesces_same_dedupe_key(self):
+		notifications.notify(DEVICE_TOKEN, "Assigned", "Booking 1: Pending", dedupe_key="booking:1")
+		notifications.notify(DEVICE_TOKEN, "Updated", "Booking 1: Completed", dedupe_key="booking:1")
+		notifications.notify(DEVICE_TOKEN, "Other", "Booking 2: Pending", dedupe_key="booking:2")
+		notifications.dispatch()
+
+		statuses = {r.title: r.status for r in self.get_statuses()}
+		self.assertEqual(statuses, {"Assigned": "Coalesced", "Updated": "Sent", "Other": "Sent"})
+
+		# one batch for the device, holding only the newest message per key
+		transport = notifications.get_transport()
+		self.assertEqual(len(transport.sent), 1)
+		self.assertEqual([m["title"] for m in transport.sent[0][1]], ["Updated", "Other"])
@@ -1,8 +1,13 @@
 # Copyright (c) 2025, ITQAN and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 class Service(Document):
 	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Service", ["category"])
+	frappe.db.add_index("Service", ["subcategory"])
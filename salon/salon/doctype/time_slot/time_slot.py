@@ -4,6 +4,9 @@
 # import frappe
 from frappe.model.document import Document
 
+from salon.utils.slots import get_slot_minutes
+
 
 class TimeSlot(Document):
-	pass
+	def validate(self):
+		self.start_minute, self.end_minute = get_slot_minutes(self.service_time, self.duration)
@@ -0,0 +1,54 @@
+# Copyright (c) 2025, ITQAN and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from salon.utils import tokens
+
+
+class TestTokens(FrappeTestCase):
+	user = "Administrator"
+
+	def test_valid_access_token(self):
+		pair = tokens.issue_tokens(self.user)
+		claims = tokens.decode(pair["access_token"])
+		self.assertEqual(claims["sub"], self.user)
+		self.assertEqual(claims["typ"], "access")
+
+	def test_tampered_signature(self):
+		token = tokens.issue_tokens(self.user)["access_token"]
+		payload, signature = token.split(".")
+		tampered = signature[:-1] + ("A" if signature[-1] != "A" else "B")
+
+		self.assertIsNone(tokens.decode(f"{payload}.{tampered}"))
+		self.assertIsNone(tokens.decode(f"{payload}x.{signature}"))
+		self.assertIsNone(tokens.decode("not-a-token"))
+
+	def test_expired_token(self):
+		token = tokens.make_token(self.user, "access", -1)
+		self.assertIsNone(tokens.decode(token))
+
+	def test_wrong_type(self):
+		pair = tokens.issue_tokens(self.user)
+		self.assertIsNone(tokens.decode(pair["refresh_token"], "access"))
+		self.assertIsNone(tokens.decode(pair["access_token"], "refresh"))
+
+	def test_revoked_token(self):
+		token = tokens.issue_tokens(self.user)["access_token"]
+		claims = tokens.decode(token)
+		self.assertIsNotNone(claims)
+
+		tokens.revoke(claims)
+		self.assertIsNone(tokens.decode(token))
+
+	def test_refresh_rotation(self):
+		pair = tokens.issue_tokens(self.user)
+
+		rotated = tokens.refresh(pair["refresh_token"])
+		self.assertIsNotNone(rotated)
+		self.assertEqual(tokens.decode(rotated["access_token"])["sub"], self.user)
+		self.assertIsNotNone(tokens.decode(rotated["refresh_token"], "refresh"))
+
+		# the old refresh token is spent
+		self.assertIsNone(tokens.decode(pair["refresh_token"], "refresh"))
+		self.assertIsNone(tokens.refresh(pair["refresh_token"]))
@@ -0,0 +1,332 @@
+"""Per-(employee, date) availability kept in Redis.
+
+Every active Booking occupies [start_minute, end_minute) of its day, where
+the end is the slot start plus the summed duration of its services. Two
+structures are written together for each (employee, date):
+
+- a sorted set of the merged busy intervals (member "start:end", score
+  start). Merged intervals never overlap, so "is [start, end) free" only has
+  to look at the interval with the greatest start before `end`: one
+  ZREVRANGEBYSCORE, O(log n).
+- a bitmap with one bit per Time Slot id, set when the slot overlaps a busy
+  interval, for listing unavailable slots. Bit 0 is never a slot id and
+  marks both keys as built, so an empty day is told apart from a day that
+  has not been loaded yet.
+
+Booking doc_events rebuild the affected keys once the transaction commits
+and publish what changed to the branch/date realtime room; readers only fall
+back to the database for keys that were never built (or have expired). A
+per-(employee, date) generation key, moved by every post-commit refresh,
+stops a slow read-miss refresh from overwriting newer keys with rows read
+before the commit.
+
+Cold start: bench --site <site> execute salon.utils.availability.rebuild
+"""
+
+from bisect import bisect_left
+
+import frappe
+from frappe.utils import add_days, cint, date_diff, getdate, today
+from redis.exceptions import WatchError
+
+from salon.utils.realtime import publish_availability_delta
+from salon.utils.service_cache import get_services
+from salon.utils.slots import get_all_slots, get_slots
+
+BUILT_BIT = 0
+KEY_GRACE_DAYS = 2
+PENDING_FLAG = "salon_availability_refresh"
+
+
+class IntervalIndex:
+    """Sorted, merged [start, end) intervals of one employee-day."""
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(i for i in intervals if i[1] > i[0]):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def is_free(self, start, end):
+        # the only candidate for an overlap is the last interval starting before `end`
+        i = bisect_left(self.starts, end) - 1
+        return i < 0 or self.ends[i] <= start
+
+
+def get_services_duration(service_ids):
+    """Total duration in minutes of the given services."""
+    services = get_services(service_ids)
+    return sum(cint(services[str(s)].duration) for s in service_ids if str(s) in services)
+
+
+def get_booking_interval(slot, service_ids):
+    """[start, end) in minutes of a booking on `slot` for `service_ids`.
+
+    Falls back to the slot's own duration when the services carry none.
+    """
+    info = get_slots([slot]).get(str(slot))
+    if not info:
+        return None
+
+    duration = get_services_duration(service_ids) or (info.end_minute - info.start_minute)
+    return info.start_minute, info.start_minute + duration
+
+
+def get_day_bookings(staff, date, exclude=None, for_update=False):
+    """Active bookings of (employee, date) with their intervals, straight from the database."""
+    Booking = frappe.qb.DocType("Booking")
+    query = (
+        frappe.qb.from_(Booking)
+        .select(Booking.name, Booking.slot, Booking.start_minute, Booking.end_minute)
+        .where(Booking.staff == staff)
+        .where(Booking.date == getdate(date))
+        .where(Booking.status != "Cancel")
+        .where(Booking.docstatus < 2)
+    )
+
+    if exclude:
+        query = query.where(Booking.name != exclude)
+
+    if for_update:
+        query = query.for_update()
+
+    return query.run(as_dict=True)
+
+
+def booking_intervals(bookings):
+    """(start, end) of each booking row; rows without a recorded interval use their slot's."""
+    slots = get_all_slots()
+    for b in bookings:
+        start, end = cint(b.start_minute), cint(b.end_minute)
+        if end <= start:
+            # rows saved before intervals were recorded
+            info = slots.get(str(b.slot))
+            if not info:
+                continue
+            start, end = info.start_minute, info.end_minute
+        yield start, end
+
+
+def _busy_slots(index, bookings):
+    busy = {str(b.slot) for b in bookings if b.slot}
+    for info in get_all_slots().values():
+        if info.end_minute > info.start_minute and not index.is_free(info.start_minute, info.end_minute):
+            busy.add(str(info.id))
+    return busy
+
+
+def _bitmap_key(staff, date):
+    return frappe.cache().make_key(f"salon:busy:{staff}:{getdate(date)}")
+
+
+def _interval_key(staff, date):
+    return frappe.cache().make_key(f"salon:intervals:{staff}:{getdate(date)}")
+
+
+def _generation_key(staff, date):
+    return frappe.cache().make_key(f"salon:availability_gen:{staff}:{getdate(date)}")
+
+
+def _key_ttl(date):
+    days = max(date_diff(getdate(date), today()), 0) + KEY_GRACE_DAYS
+    return days * 24 * 60 * 60
+
+
+def _write(pipe, staff, date, index, busy_slots):
+    bitmap_key = _bitmap_key(staff, date)
+    interval_key = _interval_key(staff, date)
+    ttl = _key_ttl(date)
+
+    pipe.delete(bitmap_key, interval_key)
+    pipe.setbit(bitmap_key, BUILT_BIT, 1)
+    for slot in busy_slots:
+        if cint(slot) > BUILT_BIT:
+            pipe.setbit(bitmap_key, cint(slot), 1)
+
+    intervals = {f"{start}:{end}": start for start, end in index}
+    if intervals:
+        pipe.zadd(interval_key, intervals)
+        pipe.expire(interval_key, ttl)
+
+    pipe.expire(bitmap_key, ttl)
+
+
+def _build(pipe, staff, date, bookings):
+    index = IntervalIndex(booking_intervals(bookings))
+    busy_slots = _busy_slots(index, bookings)
+    _write(pipe, staff, date, index, busy_slots)
+    return index, busy_slots
+
+
+def refresh(staff, date):
+    """Rebuild the keys of one (employee, date) from the database on a read miss.
+
+    The write is skipped when a booking change committed in the meantime
+    (its generation key moved): the rows read here may predate that commit,
+    and the post-commit refresh has already written the current state.
+
+    Returns (IntervalIndex, set of busy slot ids).
+    """
+    pipe = frappe.cache().pipeline()
+    try:
+        pipe.watch(_generation_key(staff, date))
+        bookings = get_day_bookings(staff, date)
+        pipe.multi()
+        index, busy_slots = _build(pipe, staff, date, bookings)
+        pipe.execute()
+    except WatchError:
+        pass
+    finally:
+        pipe.reset()
+
+    return index, busy_slots
+
+
+def _refresh_committed(staff, date):
+    """Rebuild the keys after a booking change committed, moving the
+    generation so concurrent read-miss refreshes drop their writes."""
+    generation_key = _generation_key(staff, date)
+
+    pipe = frappe.cache().pipeline()
+    pipe.incr(generation_key)
+    pipe.expire(generation_key, _key_ttl(date))
+    index, busy_slots = _build(pipe, staff, date, get_day_bookings(staff, date))
+    pipe.execute()
+
+    return index, busy_slots
+
+
+def rebuild(from_date=None, days=60):
+    """Build the keys of every (employee, date) with active bookings in range."""
+    start = getdate(from_date or today())
+    end = add_days(start, cint(days))
+
+    bookings = frappe.get_all(
+        "Booking",
+        filters=[
+            ["date", "between", [start, end]],
+            ["status", "!=", "Cancel"],
+            ["docstatus", "<", 2],
+            ["staff", "is", "set"],
+        ],
+        fields=["staff", "date", "slot", "start_minute", "end_minute"],
+    )
+
+    days_by_staff = {}
+    for b in bookings:
+        days_by_staff.setdefault((b.staff, b.date), []).append(b)
+
+    pipe = frappe.cache().pipeline()
+    for (staff, date), day_bookings in days_by_staff.items():
+        _build(pipe, staff, date, day_bookings)
+    pipe.execute()
+
+
+def is_free(staff, date, start, end):
+    """True when [start, end) does not overlap any active booking of (employee, date)."""
+    pipe = frappe.cache().pipeline()
+    pipe.getbit(_bitmap_key(staff, date), BUILT_BIT)
+    pipe.zrevrangebyscore(_interval_key(staff, date), f"({end}", "-inf", start=0, num=1)
+    built, previous = pipe.execute()
+
+    if not built:
+        index, _ = refresh(staff, date)
+        return index.is_free(start, end)
+
+    if not previous:
+        return True
+
+    return cint(previous[0].decode().split(":")[1]) <= start
+
+
+def is_slot_free(staff, date, slot, service_ids=None):
+    """True when `slot` can take a booking for `service_ids` (or the slot's
+    own duration when no services are given)."""
+    interval = get_booking_interval(slot, service_ids or [])
+    if not interval:
+        return not is_booked(staff, date, slot)
+
+    return is_free(staff, date, *interval)
+
+
+def is_booked(staff, date, slot):
+    """True when `slot` overlaps an active booking of (employee, date)."""
+    pipe = frappe.cache().pipeline()
+    key = _bitmap_key(staff, date)
+    pipe.getbit(key, BUILT_BIT)
+    pipe.getbit(key, cint(slot))
+    built, booked = pipe.execute()
+
+    if not built:
+        _, busy_slots = refresh(staff, date)
+        return str(slot) in busy_slots
+
+    return bool(booked)
+
+
+def _read_busy_slots(staff, date):
+    """Busy slot ids from the bitmap, or None when it is not built."""
+    raw = frappe.cache().get(_bitmap_key(staff, date))
+
+    # bit 0 is the most significant bit of the first byte
+    if not raw or not raw[0] & 0x80:
+        return None
+
+    return {
+        str(i * 8 + bit)
+        for i, byte in enumerate(raw)
+        if byte
+        for bit in range(8)
+        if byte & (0x80 >> bit) and i * 8 + bit != BUILT_BIT
+    }
+
+
+def get_booked_slots(staff, date):
+    """Slot ids overlapping active bookings of (employee, date)."""
+    busy_slots = _read_busy_slots(staff, date)
+    if busy_slots is None:
+        _, busy_slots = refresh(staff, date)
+
+    return list(busy_slots)
+
+
+def _flush_pending():
+    for (staff, date), branches in frappe.flags.pop(PENDING_FLAG, {}).items():
+        before = _read_busy_slots(staff, date)
+        _, after = _refresh_committed(staff, date)
+        publish_availability_delta(staff, date, branches, before, after)
+
+
+def _discard_pending():
+    frappe.flags.pop(PENDING_FLAG, None)
+
+
+def _schedule_refresh(staff, date, branch):
+    pending = frappe.flags.get(PENDING_FLAG)
+    if pending is None:
+        pending = frappe.flags[PENDING_FLAG] = {}
+        frappe.db.after_commit.add(_flush_pending)
+        frappe.db.after_rollback.add(_discard_pending)
+
+    branches = pending.setdefault((staff, str(getdate(date))), set())
+    if branch:
+        branches.add(str(branch))
+
+
+def on_booking_change(doc, method=None):
+    """Booking after_insert / on_update / on_trash: refresh the keys of the
+    old and new (staff, date) after commit and push the change to clients."""
+    previous = doc.get_doc_before_save()
+
+    for d in (previous, doc):
+        if d and d.staff and d.date:
+            _schedule_refresh(d.staff, d.date, d.branch)
@@ -0,0 +1,103 @@
+"""Versioned snapshot of the catalog: Categories, Services, Branches, Sliders.
+
+The catalog changes a few times a week but is read on every app launch. The
+rows the catalog endpoints need are loaded once into a snapshot stored in
+Redis with a content hash. Any change to those doctypes drops it (doc_events)
+and the next request rebuilds it. Endpoints send the hash as ETag and answer
+a matching If-None-Match with 304 Not Modified (see `set_etag`, registered as
+an after_request hook).
+"""
+
+import hashlib
+
+import frappe
+
+from salon.utils.images import PENDING_FLAG
+
+SNAPSHOT_KEY = "salon:catalog_snapshot"
+
+
+def _build_snapshot():
+    data = {
+        "categories": frappe.get_all(
+            "Categories",
+            filters={"disable": 0},
+            fields=["name", "name_english", "name_arabic", "is_group", "image", "parent_categories"],
+        ),
+        # service_list still queries per filter; (name, modified) is enough
+        # for the ETag to change with any service
+        "services": frappe.get_all(
+            "Service",
+            filters={"disabled": 0},
+            fields=["name", "modified"],
+            order_by="name asc",
+            as_list=True,
+        ),
+        "branches": frappe.get_all(
+            "Branches",
+            filters={"disabled": 0},
+            fields=["name as id", "name1 as name", "branch_for", "contact_number", "image as branch_image"],
+        ),
+        "sliders": frappe.get_all(
+            "Slider",
+            filters={"disabled": 0},
+            fields=["name", "slider_name", "image"],
+        ),
+    }
+
+    blob = frappe.as_json(data, indent=None)
+    return {"etag": hashlib.sha1(blob.encode()).hexdigest(), "data": data}
+
+
+def get_snapshot():
+    """{"etag": content hash, "data": {categories, services, branches, sliders}}."""
+    return frappe.cache().get_value(SNAPSHOT_KEY, generator=_build_snapshot)
+
+
+def invalidate(doc=None, method=None):
+    """on_update / on_trash of Categories, Service, Branches and Slider."""
+    frappe.cache().delete_value(SNAPSHOT_KEY)
+    # again after commit, in case a request rebuilt it from pre-commit rows
+    frappe.db.after_commit.add(_clear)
+
+
+def _clear():
+    frappe.cache().delete_value(SNAPSHOT_KEY)
+
+
+def not_modified(etag):
+    """Tag the response with `etag`; True when the client already has it."""
+    frappe.flags.salon_etag = etag
+
+    if frappe.request and frappe.request.if_none_match.contains(etag):
+        frappe.flags.salon_not_modified = True
+        return True
+
+    return False
+
+
+def set_etag(response=None, request=None):
+    """after_request: apply the ETag / 304 decided by `not_modified`."""
+    etag = frappe.flags.get("salon_etag")
+    if not etag or response is None:
+        return
+
+    # image variants still being generated: the body will change without the
+    # catalog changing, so it must not be cached against this ETag
+    if frappe.flags.get(PENDING_FLAG):
+        return
+
+    if frappe.flags.get("salon_not_modified"):
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        response.status_code = 304
+        response.set_data(b"")
+        return
+
+    # only a successful body may be cached against the catalog version;
+    # error responses from the endpoints' except branches must not be
+    if frappe.response.get("status") is not True or response.status_code != 200:
+        return
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
@@ -0,0 +1,107 @@
+"""Whole Categories tree in one ordered range scan over the nested set.
+
+Rows come back ordered by `lft`, so every node follows its parent and a stack
+of open ancestors (popped once their `rgt` is passed) is enough to nest them
+in one pass. Disabled nodes are dropped together with their subtree.
+
+The rows are cached until a Categories doc changes; per-node service counts
+are cached separately until a Service changes.
+"""
+
+import frappe
+
+TREE_KEY = "salon:category_tree"
+COUNTS_KEY = "salon:category_service_counts"
+
+
+def _load_rows():
+    Categories = frappe.qb.DocType("Categories")
+    return (
+        frappe.qb.from_(Categories)
+        .select(
+            Categories.name,
+            Categories.name_english,
+            Categories.name_arabic,
+            Categories.is_group,
+            Categories.image,
+            Categories.parent_categories,
+            Categories.disable,
+            Categories.lft,
+            Categories.rgt,
+        )
+        .orderby(Categories.lft)
+        .run(as_dict=True)
+    )
+
+
+def _load_counts():
+    """{category: number of enabled services under it as category or subcategory}."""
+    counts = {}
+    for category, subcategory in frappe.get_all(
+        "Service", filters={"disabled": 0}, fields=["category", "subcategory"], as_list=True
+    ):
+        for node in {category, subcategory} - {None, ""}:
+            counts[str(node)] = counts.get(str(node), 0) + 1
+    return counts
+
+
+def get_rows():
+    return frappe.cache().get_value(TREE_KEY, generator=_load_rows)
+
+
+def get_service_counts():
+    return frappe.cache().get_value(COUNTS_KEY, generator=_load_counts)
+
+
+def build_tree(rows, make_node, counts=None):
+    """Nest `rows` (ordered by lft) into a list of root nodes.
+
+    `make_node(row)` returns the dict for a row; a "children" list (and
+    "service_count" when `counts` is given) is added to it.
+    """
+    roots = []
+    stack = []  # (rgt, node) of open ancestors
+    skip_until = None  # rgt of a disabled subtree being skipped
+
+    for row in rows:
+        if skip_until is not None:
+            if row.lft < skip_until:
+                continue
+            skip_until = None
+
+        if row.disable:
+            skip_until = row.rgt
+            continue
+
+        while stack and stack[-1][0] < row.lft:
+            stack.pop()
+
+        node = make_node(row)
+        node["children"] = []
+        if counts is not None:
+            node["service_count"] = counts.get(str(row.name), 0)
+
+        (stack[-1][1]["children"] if stack else roots).append(node)
+        stack.append((row.rgt, node))
+
+    return roots
+
+
+def clear_tree_cache(doc=None, method=None):
+    """Categories on_update / on_trash."""
+    frappe.cache().delete_value(TREE_KEY)
+    frappe.db.after_commit.add(_clear_tree)
+
+
+def _clear_tree():
+    frappe.cache().delete_value(TREE_KEY)
+
+
+def clear_count_cache(doc=None, method=None):
+    """Service on_update / on_trash."""
+    frappe.cache().delete_value(COUNTS_KEY)
+    frappe.db.after_commit.add(_clear_counts)
+
+
+def _clear_counts():
+    frappe.cache().delete_value(COUNTS_KEY)
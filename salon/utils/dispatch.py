@@ -0,0 +1,239 @@
+"""Assign drivers to every unassigned booking of a day in one run.
+
+`plan_dispatch` loads the day's unassigned bookings, driver coverage (States
+and Employee rows of each Drivers doc) and the load already assigned, in
+four queries. It then assigns greedily, most constrained booking first: each
+booking goes to the covering driver with the fewest bookings in that slot,
+then the fewest that day, then the nearest. A driver takes at most
+`max_per_slot` bookings per slot. The plan is plain data, so it can be
+reviewed (dry run) before `apply_plan` writes it with one CASE UPDATE per
+chunk, in a single transaction.
+"""
+
+import frappe
+from frappe.query_builder import Case
+from frappe.query_builder.functions import Count
+from frappe.utils import cint, getdate, now_datetime
+
+from salon.utils import geo
+from salon.utils.manifest import clear_manifest
+from salon.utils.notifications import notify
+
+OPEN_STATUSES = ("Pending", "Confirmed", "Check in")
+UPDATE_CHUNK = 1000
+
+
+def _load_bookings(date):
+    Booking = frappe.qb.DocType("Booking")
+    return (
+        frappe.qb.from_(Booking)
+        .select(Booking.name, Booking.state, Booking.staff, Booking.slot, Booking.latitude, Booking.longitude)
+        .where(Booking.date == date)
+        .where(Booking.status.isin(OPEN_STATUSES))
+        .where(Booking.docstatus < 2)
+        .where(Booking.driver.isnull() | (Booking.driver == ""))
+        .orderby(Booking.slot)
+        .orderby(Booking.name)
+        .run(as_dict=True)
+    )
+
+
+def _load_drivers():
+    """{driver: row with `states` and `staff` sets}."""
+    drivers = {
+        str(d.name): d
+        for d in frappe.get_all(
+            "Drivers", fields=["name", "driver_name", "device_token", "latitude", "longitude"]
+        )
+    }
+    for d in drivers.values():
+        d.states, d.staff = set(), set()
+
+    for parent, state in frappe.get_all(
+        "list of States table", filters={"parenttype": "Drivers"}, fields=["parent", "states"], as_list=True
+    ):
+        if str(parent) in drivers:
+            drivers[str(parent)].states.add(str(state))
+
+    for parent, employee in frappe.get_all(
+        "Employee Select Table", filters={"parenttype": "Drivers"}, fields=["parent", "employee"], as_list=True
+    ):
+        if str(parent) in drivers:
+            drivers[str(parent)].staff.add(str(employee))
+
+    return drivers
+
+
+def _load_assigned(date):
+    """{(driver, slot): bookings already assigned} for the day."""
+    Booking = frappe.qb.DocType("Booking")
+    rows = (
+        frappe.qb.from_(Booking)
+        .select(Booking.driver, Booking.slot, Count("*"))
+        .where(Booking.date == date)
+        .where(Booking.status.isin(OPEN_STATUSES))
+        .where(Booking.docstatus < 2)
+        .where(Booking.driver.isnotnull() & (Booking.driver != ""))
+        .groupby(Booking.driver, Booking.slot)
+        .run()
+    )
+    return {(str(driver), str(slot)): cint(count) for driver, slot, count in rows}
+
+
+def plan_dispatch(date, max_per_slot=1):
+    """{"date", "assignments": [{booking_id, driver_id, driver_name, slot, distance_km}],
+    "unassigned": [booking ids], "load": {driver: bookings that day}}."""
+    date = getdate(date)
+    max_per_slot = cint(max_per_slot) or 1
+
+    bookings = _load_bookings(date)
+    drivers = _load_drivers()
+
+    slot_load = _load_assigned(date)
+    day_load = {}
+    for (driver, _), count in slot_load.items():
+        day_load[driver] = day_load.get(driver, 0) + count
+
+    # same (state, staff) -> same candidates
+    candidates = {}
+    for b in bookings:
+        key = (str(b.state), str(b.staff or ""))
+        if key not in candidates:
+            candidates[key] = [
+                name for name, d in drivers.items()
+                if key[0] in d.states and (not b.staff or key[1] in d.staff)
+            ]
+
+    ordered = sorted(bookings, key=lambda b: (len(candidates[(str(b.state), str(b.staff or ""))]), str(b.slot)))
+
+    assignments = []
+    unassigned = []
+    for b in ordered:
+        slot = str(b.slot)
+        located = geo.has_coordinates(b.latitude, b.longitude)
+
+        best = None
+        for name in candidates[(str(b.state), str(b.staff or ""))]:
+            in_slot = slot_load.get((name, slot), 0)
+            if in_slot >= max_per_slot:
+                continue
+
+            d = drivers[name]
+            distance = None
+            if located and geo.has_coordinates(d.latitude, d.longitude):
+                distance = geo.haversine_km(b.latitude, b.longitude, d.latitude, d.longitude)
+
+            rank = (in_slot, day_load.get(name, 0), distance if distance is not None else float("inf"), name)
+            if best is None or rank < best[0]:
+                best = (rank, name, distance)
+
+        if best is None:
+            unassigned.append(b.name)
+            continue
+
+        _, name, distance = best
+        slot_load[(name, slot)] = slot_load.get((name, slot), 0) + 1
+        day_load[name] = day_load.get(name, 0) + 1
+        assignments.append({
+            "booking_id": b.name,
+            "driver_id": name,
+            "driver_name": drivers[name].driver_name,
+            "slot": b.slot,
+            "distance_km": round(distance, 2) if distance is not None else None,
+        })
+
+    return {
+        "date": str(date),
+        "assignments": assignments,
+        "unassigned": unassigned,
+        "load": day_load,
+    }
+
+
+def apply_plan(plan):
+    """Write the plan's assignments and driver notifications in one
+    transaction; bookings that got a driver in the meantime are left alone.
+    Returns the assignments actually written."""
+    assignments = plan["assignments"]
+    if not assignments:
+        return []
+
+    Booking = frappe.qb.DocType("Booking")
+    modified = now_datetime()
+    written = []
+
+    for i in range(0, len(assignments), UPDATE_CHUNK):
+        chunk = assignments[i : i + UPDATE_CHUNK]
+        names = [a["booking_id"] for a in chunk]
+        driver = Case()
+        driver_name = Case()
+        for a in chunk:
+            driver = driver.when(Booking.name == a["booking_id"], a["driver_id"])
+            driver_name = driver_name.when(Booking.name == a["booking_id"], a["driver_name"])
+
+        frappe.qb.update(Booking).set(Booking.driver, driver).set(Booking.driver_name, driver_name).set(
+            Booking.modified, modified
+        ).where(Booking.name.isin(names)).where(Booking.driver.isnull() | (Booking.driver == "")).run()
+
+        # rows skipped by the guard keep their own driver / modified
+        updated = {
+            (str(name), str(driver_id))
+            for name, driver_id in frappe.qb.from_(Booking)
+            .select(Booking.name, Booking.driver)
+            .where(Booking.name.isin(names))
+            .where(Booking.modified == modified)
+            .run()
+        }
+        written += [a for a in chunk if (str(a["booking_id"]), str(a["driver_id"])) in updated]
+
+    _notify_drivers(plan["date"], written)
+    frappe.db.commit()
+
+    # the UPDATE bypasses Booking doc_events
+    for driver in {a["driver_id"] for a in written}:
+        clear_manifest(driver, plan["date"])
+
+    return written
+
+
+def _notify_drivers(date, assignments):
+    counts = {}
+    for a in assignments:
+        counts[a["driver_id"]] = counts.get(a["driver_id"], 0) + 1
+    if not counts:
+        return
+
+    tokens = dict(
+        frappe.get_all(
+            "Drivers", filters={"name": ["in", list(counts)]}, fields=["name", "device_token"], as_list=True
+        )
+    )
+    for driver, count in counts.items():
+        notify(
+            tokens.get(driver),
+            title="New bookings",
+            message=f"{count} booking(s) assigned for {date}",
+            data={"date": date, "count": count},
+            dedupe_key=f"dispatch:{date}",
+            driver=driver,
+        )
+
+
+def dispatch_day(date, max_per_slot=1, user=None):
+    """Background job: plan and apply, then report the summary to `user`."""
+    plan = plan_dispatch(date, max_per_slot)
+    written = apply_plan(plan)
+    written_ids = {a["booking_id"] for a in written}
+
+    if user:
+        frappe.publish_realtime(
+            "salon_dispatch_done",
+            {
+                "date": plan["date"],
+                "assigned": len(written),
+                "unassigned": plan["unassigned"],
+                # assigned by someone else after planning
+                "skipped": [a["booking_id"] for a in plan["assignments"] if a["booking_id"] not in written_ids],
+            },
+            user=user,
+        )
@@ -0,0 +1,197 @@
+"""Driver GPS pings, buffered in Redis and written to the database in bulk.
+
+The ingest endpoint only appends pings to a Redis list (capped at
+MAX_BUFFERED, oldest dropped first) and updates the driver's last known
+position in a Redis hash, so a ping costs one round trip and no database
+transaction. `flush` (scheduled every minute) moves the buffer into the
+append-only Driver Location table with bulk inserts and copies the latest
+position of each driver onto Drivers. Rows carry their `day`, indexed with
+the driver, and `purge_old_locations` drops whole days past the retention.
+"""
+
+import json
+import time
+from datetime import datetime, timezone
+
+import frappe
+from frappe.query_builder import Case
+from frappe.utils import add_days, cint, convert_utc_to_system_timezone, flt, now_datetime, today
+
+BUFFER_KEY = "salon:driver_location_buffer"
+LAST_POSITION_KEY = "salon:driver_last_position"
+MAX_BUFFERED = 200_000
+FLUSH_BATCH = 5000
+DEFAULT_RETENTION_DAYS = 30
+PING_FIELDS = ("driver", "ts", "lat", "lng", "accuracy", "speed", "heading")
+
+# keep the newest ping per driver even when pings arrive out of order
+SET_LAST_SCRIPT = """
+local current = redis.call('hget', KEYS[1], ARGV[1])
+if current and tonumber(string.match(current, '^[^,]+')) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('hset', KEYS[1], ARGV[1], ARGV[3])
+return 1
+"""
+
+
+def parse_ping(driver, ping):
+    """[driver, ts, lat, lng, accuracy, speed, heading] of one ping dict, or
+    None when its coordinates are missing or out of range."""
+    lat, lng = flt(ping.get("lat", ping.get("latitude"))), flt(ping.get("lng", ping.get("longitude")))
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or not (lat or lng):
+        return None
+
+    now = time.time()
+    ts = flt(ping.get("ts")) or now
+    if ts > 1e12:
+        # milliseconds
+        ts /= 1000
+    ts = min(ts, now)
+
+    return [
+        str(driver),
+        round(ts, 3),
+        lat,
+        lng,
+        flt(ping.get("accuracy")),
+        flt(ping.get("speed")),
+        flt(ping.get("heading")),
+    ]
+
+
+def record_pings(driver, pings):
+    """Buffer `pings` (dicts with lat, lng and optional ts, accuracy, speed,
+    heading) of one driver. Returns the number accepted."""
+    records = sorted(filter(None, (parse_ping(driver, p) for p in pings)), key=lambda r: r[1])
+    if not records:
+        return 0
+
+    cache = frappe.cache()
+    buffer_key = cache.make_key(BUFFER_KEY)
+
+    pipe = cache.pipeline()
+    pipe.rpush(buffer_key, *[json.dumps(r, separators=(",", ":")) for r in records])
+    pipe.ltrim(buffer_key, -MAX_BUFFERED, -1)
+    pipe.execute()
+
+    _, ts, lat, lng = records[-1][:4]
+    cache.eval(SET_LAST_SCRIPT, 1, cache.make_key(LAST_POSITION_KEY), str(driver), ts, f"{ts},{lat},{lng}")
+
+    return len(records)
+
+
+def get_last_positions(drivers=None):
+    """{driver: {"lat", "lng", "ts"}} of the given drivers (all when omitted)."""
+    cache = frappe.cache()
+    key = cache.make_key(LAST_POSITION_KEY)
+
+    names = [str(d) for d in drivers] if drivers else [frappe.safe_decode(k) for k in cache.hkeys(LAST_POSITION_KEY)]
+    if not names:
+        return {}
+
+    positions = {}
+    for name, value in zip(names, cache.hmget(key, names)):
+        if value is None:
+            continue
+        ts, lat, lng = (float(v) for v in value.decode().split(","))
+        positions[name] = {"lat": lat, "lng": lng, "ts": ts}
+
+    return positions
+
+
+def _take(count):
+    """Atomically remove and return up to `count` buffered pings."""
+    cache = frappe.cache()
+    key = cache.make_key(BUFFER_KEY)
+
+    pipe = cache.pipeline()
+    pipe.lrange(key, 0, count - 1)
+    pipe.ltrim(key, count, -1)
+    raw, _ = pipe.execute()
+
+    return [json.loads(r) for r in raw]
+
+
+def _put_back(records):
+    """Return `records` to the head of the buffer, in their original order."""
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.lpush(cache.make_key(BUFFER_KEY), *[json.dumps(r, separators=(",", ":")) for r in reversed(records)])
+    pipe.execute()
+
+
+def _write(records):
+    now = now_datetime()
+    values = []
+    latest = {}
+    for driver, ts, lat, lng, accuracy, speed, heading in records:
+        recorded_at = convert_utc_to_system_timezone(datetime.fromtimestamp(ts, timezone.utc)).replace(tzinfo=None)
+        # autoincrement doctype: `name` has no column default, so each row
+        # takes the next value of the doctype's sequence
+        name = frappe.db.get_next_sequence_val("Driver Location")
+        values.append(
+            (name, now, now, "Administrator", "Administrator", driver, recorded_at.date(), recorded_at)
+            + (lat, lng, accuracy, speed, heading)
+        )
+        if driver not in latest or ts >= latest[driver][0]:
+            latest[driver] = (ts, lat, lng)
+
+    frappe.db.bulk_insert(
+        "Driver Location",
+        fields=[
+            "name", "creation", "modified", "owner", "modified_by", "driver", "day", "recorded_at",
+            "latitude", "longitude", "accuracy", "speed", "heading",
+        ],
+        values=values,
+    )
+
+    Drivers = frappe.qb.DocType("Drivers")
+    latitude, longitude = Case(), Case()
+    for driver, (_, lat, lng) in latest.items():
+        latitude = latitude.when(Drivers.name == driver, lat)
+        longitude = longitude.when(Drivers.name == driver, lng)
+
+    frappe.qb.update(Drivers).set(Drivers.latitude, latitude).set(Drivers.longitude, longitude).where(
+        Drivers.name.isin(list(latest))
+    ).run()
+
+
+def flush(max_batches=20):
+    """Scheduler: move buffered pings into Driver Location, FLUSH_BATCH rows
+    per transaction."""
+    existing = None
+
+    for _ in range(cint(max_batches)):
+        records = _take(FLUSH_BATCH)
+        if not records:
+            break
+
+        if existing is None:
+            existing = {str(d) for d in frappe.get_all("Drivers", pluck="name")}
+
+        # pings of drivers deleted since they were buffered are dropped
+        records = [r for r in records if r[0] in existing]
+        if not records:
+            continue
+
+        try:
+            _write(records)
+            frappe.db.commit()
+        except Exception:
+            # deferred, so the rollback below does not discard the log
+            frappe.log_error(
+                title="Driver Location Flush Error", message=frappe.get_traceback(), defer_insert=True
+            )
+            frappe.db.rollback()
+            _put_back(records)
+            break
+
+
+def purge_old_locations():
+    """Scheduler (daily): delete days older than the retention
+    (site config `salon_location_retention_days`)."""
+    days = cint(frappe.conf.get("salon_location_retention_days")) or DEFAULT_RETENTION_DAYS
+    Location = frappe.qb.DocType("Driver Location")
+    frappe.qb.from_(Location).delete().where(Location.day < add_days(today(), -days)).run()
+    frappe.db.commit()
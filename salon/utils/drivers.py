@@ -0,0 +1,50 @@
+"""Driver lookups served from the Drivers child tables.
+
+A driver's coverage lives in its `states` (list of States table) and `staff`
+(Employee Select Table) rows. Both child tables carry an index on the linked
+value, so eligibility is an indexed join whose cost follows the number of
+matching rows. Frappe rewrites those rows whenever a Drivers doc is saved,
+which keeps the index current without extra bookkeeping.
+"""
+
+import frappe
+
+
+def get_eligible_drivers(state, employee=None, bounds=None):
+    """Drivers covering `state` and, when given, assigned to `employee` and
+    located inside `bounds` (min_lat, max_lat, min_lng, max_lng)."""
+    Drivers = frappe.qb.DocType("Drivers")
+    States = frappe.qb.DocType("list of States table")
+
+    query = (
+        frappe.qb.from_(States)
+        .join(Drivers)
+        .on(Drivers.name == States.parent)
+        .select(
+            Drivers.name,
+            Drivers.driver_name,
+            Drivers.user,
+            Drivers.device_token,
+            Drivers.latitude,
+            Drivers.longitude,
+        )
+        .where(States.states == state)
+        .where(States.parenttype == "Drivers")
+        .distinct()
+    )
+
+    if employee:
+        Staff = frappe.qb.DocType("Employee Select Table")
+        query = (
+            query.join(Staff)
+            .on((Staff.parent == Drivers.name) & (Staff.parenttype == "Drivers"))
+            .where(Staff.employee == employee)
+        )
+
+    if bounds:
+        min_lat, max_lat, min_lng, max_lng = bounds
+        query = query.where(Drivers.latitude.between(min_lat, max_lat)).where(
+            Drivers.longitude.between(min_lng, max_lng)
+        )
+
+    return query.run(as_dict=True)
@@ -0,0 +1,54 @@
+"""Which employees can serve a booking.
+
+Branch staff and Service staff are both stored as Employee Select Table rows
+(indexed on employee, parenttype), so "employees of branch B who can perform
+every service in S" is a single query: the branch rows joined to active
+Employees, restricted to employees whose Service rows cover all of S
+(GROUP BY employee HAVING COUNT(DISTINCT service) = len(S)).
+"""
+
+import frappe
+from frappe.query_builder.functions import Count
+
+
+def get_eligible_employees(branch_id=None, service_ids=None, fields=None):
+    """Active employees of `branch_id` (any branch when omitted) who are
+    assigned to every Service in `service_ids`.
+
+    Returns rows with `name` plus the requested Employee `fields`.
+    """
+    service_ids = list(dict.fromkeys(str(s) for s in service_ids or [] if s))
+
+    Employee = frappe.qb.DocType("Employee")
+    query = (
+        frappe.qb.from_(Employee)
+        .select(Employee.name, *[Employee[f] for f in fields or []])
+        .where(Employee.status == "Active")
+        .orderby(Employee.name)
+    )
+
+    if branch_id:
+        BranchStaff = frappe.qb.DocType("Employee Select Table")
+        query = query.where(
+            Employee.name.isin(
+                frappe.qb.from_(BranchStaff)
+                .select(BranchStaff.employee)
+                .where(BranchStaff.parenttype == "Branches")
+                .where(BranchStaff.parent == branch_id)
+            )
+        )
+
+    if service_ids:
+        ServiceStaff = frappe.qb.DocType("Employee Select Table")
+        query = query.where(
+            Employee.name.isin(
+                frappe.qb.from_(ServiceStaff)
+                .select(ServiceStaff.employee)
+                .where(ServiceStaff.parenttype == "Service")
+                .where(ServiceStaff.parent.isin(service_ids))
+                .groupby(ServiceStaff.employee)
+                .having(Count(ServiceStaff.parent).distinct() == len(service_ids))
+            )
+        )
+
+    return query.run(as_dict=True)
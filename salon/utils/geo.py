@@ -0,0 +1,64 @@
+"""Coordinates of bookings and drivers.
+
+Booking.lat_lng is free text written by the app as "<lat>-<lng>" (sometimes
+"<lat>,<lng>"); it is parsed once on save into numeric `latitude` /
+`longitude`, which carry a composite index so a bounding box around a point
+is an index range scan. Distances are great-circle (haversine) kilometres.
+"""
+
+import math
+import re
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+LAT_LNG = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*[-,\s]\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+def parse_lat_lng(value):
+    """(latitude, longitude) of a lat_lng string, or None when it is not one."""
+    match = LAT_LNG.match(value or "")
+    if not match:
+        return None
+
+    lat, lng = float(match.group(1)), float(match.group(2))
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+
+    return lat, lng
+
+
+def has_coordinates(lat, lng):
+    # (0, 0) is what an unset Float column reads as
+    return lat is not None and lng is not None and (lat or lng)
+
+
+def bounding_box(lat, lng, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) enclosing a circle of `radius_km`."""
+    dlat = radius_km / KM_PER_DEGREE
+    dlng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    return rank_by_distance(lat1, lng1, [(None, lat2, lng2)])[0][1]
+
+
+def rank_by_distance(lat, lng, points):
+    """[(key, km)] of `points` [(key, lat, lng)], nearest first, in one pass
+    with the origin's terms computed once."""
+    phi1 = math.radians(lat)
+    cos_phi1 = math.cos(phi1)
+    lng1 = math.radians(lng)
+
+    ranked = []
+    for key, plat, plng in points:
+        phi2 = math.radians(plat)
+        a = (
+            math.sin((phi2 - phi1) / 2) ** 2
+            + cos_phi1 * math.cos(phi2) * math.sin((math.radians(plng) - lng1) / 2) ** 2
+        )
+        ranked.append((key, 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))))
+
+    ranked.sort(key=lambda r: r[1])
+    return ranked
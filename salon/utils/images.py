@@ -0,0 +1,145 @@
+"""Fixed-width variants of public images for list endpoints.
+
+A variant of /files/<name> is written to /files/thumbnails/ as WebP (JPEG
+when Pillow lacks WebP support), never upscaled. Variants are generated in
+the background when an image is attached to one of IMAGE_DOCTYPES, or on
+first request for images uploaded before this existed. Until a variant
+exists the original URL is returned and the response is not given an ETag,
+so clients pick up the variant on their next request. Sources that cannot
+be resized (missing, undecodable) are remembered for a day and served as is,
+without holding back the ETag.
+
+List endpoints take a `size` parameter, one of SIZES; no size (or an unknown
+one) keeps the original URL.
+"""
+
+import hashlib
+import os
+
+import frappe
+
+SIZES = {"small": 160, "medium": 480, "large": 1024}
+IMAGE_DOCTYPES = ("Service", "Categories", "Branches", "Slider", "Employee")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tiff")
+VARIANT_FOLDER = "thumbnails"
+QUALITY = 80
+PENDING_FLAG = "salon_image_variant_pending"
+FAILED_TTL = 24 * 60 * 60
+
+
+def _variant_format():
+    from PIL import features
+
+    return ("WEBP", "webp") if features.check("webp") else ("JPEG", "jpg")
+
+
+def _is_public_image(file_url):
+    return (
+        bool(file_url)
+        and file_url.startswith("/files/")
+        and not file_url.startswith(f"/files/{VARIANT_FOLDER}/")
+        and file_url.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def _variant_name(file_url, width):
+    stem = os.path.splitext(os.path.basename(file_url))[0]
+    digest = hashlib.sha1(file_url.encode()).hexdigest()[:10]
+    return f"{stem}-{digest}-{width}.{_variant_format()[1]}"
+
+
+def _variant_path(name):
+    return frappe.get_site_path("public", "files", VARIANT_FOLDER, name)
+
+
+def _failed_key(file_url):
+    return f"salon:image_variant_failed:{hashlib.sha1(file_url.encode()).hexdigest()}"
+
+
+def _mark_failed(file_url):
+    """Remember for FAILED_TTL that `file_url` cannot be resized, so requests
+    stop queueing jobs for it and keep their ETag."""
+    frappe.cache().set_value(_failed_key(file_url), 1, expires_in_sec=FAILED_TTL)
+
+
+def get_image_url(file_url, size=None):
+    """URL path of the `size` variant of `file_url`, or `file_url` itself
+    when no size is asked for or the variant is not there yet."""
+    width = SIZES.get(size) if size else None
+    if not width or not _is_public_image(file_url):
+        return file_url
+
+    name = _variant_name(file_url, width)
+    if os.path.exists(_variant_path(name)):
+        return f"/files/{VARIANT_FOLDER}/{name}"
+
+    if frappe.cache().get_value(_failed_key(file_url)):
+        return file_url
+
+    frappe.flags[PENDING_FLAG] = True
+    enqueue_variants(file_url)
+    return file_url
+
+
+def enqueue_variants(file_url, after_commit=False):
+    frappe.enqueue(
+        "salon.utils.images.generate_variants",
+        queue="short",
+        job_id=f"salon_image_variants:{file_url}",
+        deduplicate=True,
+        enqueue_after_commit=after_commit,
+        file_url=file_url,
+    )
+
+
+def generate_variants(file_url):
+    """Write every SIZES variant of a public image that is missing."""
+    from PIL import Image
+
+    source = frappe.get_site_path("public", file_url.lstrip("/"))
+    if not _is_public_image(file_url) or not os.path.exists(source):
+        _mark_failed(file_url)
+        return
+
+    try:
+        _write_variants(file_url, source)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        # unreadable or unsupported image
+        frappe.log_error(frappe.get_traceback(), "Image Variant Error")
+        _mark_failed(file_url)
+
+
+def _write_variants(file_url, source):
+    from PIL import Image, ImageOps
+
+    image_format, _ = _variant_format()
+    os.makedirs(_variant_path(""), exist_ok=True)
+
+    with Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+
+        for width in sorted(set(SIZES.values())):
+            path = _variant_path(_variant_name(file_url, width))
+            if os.path.exists(path):
+                continue
+
+            image = original.copy()
+            if image.width > width:
+                image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+
+            if image_format == "JPEG":
+                image = image.convert("RGB")
+            elif image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+
+            # write then rename, so readers never see a partial file
+            tmp = f"{path}.tmp"
+            image.save(tmp, image_format, quality=QUALITY)
+            os.replace(tmp, path)
+
+
+def on_file_insert(doc, method=None):
+    """File after_insert: queue variants of images attached to catalog docs."""
+    if doc.attached_to_doctype in IMAGE_DOCTYPES and not doc.is_private and _is_public_image(doc.file_url):
+        frappe.cache().delete_value(_failed_key(doc.file_url))
+        enqueue_variants(doc.file_url, after_commit=True)
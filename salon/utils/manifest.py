@@ -0,0 +1,186 @@
+"""A driver's day: compact stop records in driving order.
+
+Stops are grouped by slot (in time order). Inside a slot they are ordered by
+nearest neighbour from the previous stop, then improved with 2-opt. Stops
+without coordinates keep their place at the end of their slot. The manifest
+is cached per (driver, date) until one of that day's bookings changes
+(Booking doc_events, plus auto-dispatch, which writes without them).
+"""
+
+import frappe
+from frappe.utils import getdate
+
+from salon.utils import geo
+from salon.utils.slots import get_slots
+
+MANIFEST_TTL = 2 * 24 * 60 * 60
+MAX_TWO_OPT_PASSES = 20
+
+
+def _key(driver, date):
+    return f"salon:driver_manifest:{driver}:{getdate(date)}"
+
+
+def _path_length(points):
+    return sum(geo.haversine_km(*a, *b) for a, b in zip(points, points[1:]))
+
+
+def order_stops(stops, start=None):
+    """`stops` [(key, lat, lng)] as an open path from `start` (lat, lng),
+    or from the first stop when no start is given."""
+    if len(stops) < 2:
+        return list(stops)
+
+    remaining = list(stops)
+    if start is None:
+        route = [remaining.pop(0)]
+        head = []
+    else:
+        route = []
+        head = [tuple(start)]
+
+    # nearest neighbour
+    current = route[-1][1:] if route else head[0]
+    while remaining:
+        key, _ = geo.rank_by_distance(*current, remaining)[0]
+        stop = next(s for s in remaining if s[0] == key)
+        remaining.remove(stop)
+        route.append(stop)
+        current = stop[1:]
+
+    # 2-opt on the open path; points[0] (the start) stays in place
+    points = head + [s[1:] for s in route]
+    offset = len(head)
+    for _ in range(MAX_TWO_OPT_PASSES):
+        improved = False
+        for i in range(1, len(points) - 1):
+            for k in range(i + 1, len(points)):
+                before = geo.haversine_km(*points[i - 1], *points[i])
+                after = geo.haversine_km(*points[i - 1], *points[k])
+                if k + 1 < len(points):
+                    before += geo.haversine_km(*points[k], *points[k + 1])
+                    after += geo.haversine_km(*points[i], *points[k + 1])
+                if after < before - 1e-9:
+                    points[i : k + 1] = reversed(points[i : k + 1])
+                    route[i - offset : k + 1 - offset] = reversed(route[i - offset : k + 1 - offset])
+                    improved = True
+        if not improved:
+            break
+
+    return route
+
+
+def build_manifest(driver, date):
+    date = getdate(date)
+    Booking = frappe.qb.DocType("Booking")
+    bookings = (
+        frappe.qb.from_(Booking)
+        .select(
+            Booking.name,
+            Booking.slot,
+            Booking.status,
+            Booking.customer,
+            Booking.customer_phone,
+            Booking.is_quick_booking,
+            Booking.customer_phone_qb,
+            Booking.state,
+            Booking.staff_name,
+            Booking.latitude,
+            Booking.longitude,
+        )
+        .where(Booking.driver == driver)
+        .where(Booking.date == date)
+        .where(Booking.status != "Cancel")
+        .where(Booking.docstatus < 2)
+        .run(as_dict=True)
+    )
+
+    slots = get_slots({b.slot for b in bookings if b.slot})
+    users = {
+        u.name: u
+        for u in frappe.get_all(
+            "User", filters={"name": ["in", list({b.customer for b in bookings if b.customer})]},
+            fields=["name", "full_name", "mobile_no"],
+        )
+    } if bookings else {}
+    states = dict(
+        frappe.get_all(
+            "States", filters={"name": ["in", list({b.state for b in bookings if b.state})]},
+            fields=["name", "state_name_ar"], as_list=True,
+        )
+    ) if bookings else {}
+
+    by_slot = {}
+    for b in bookings:
+        by_slot.setdefault(str(b.slot or ""), []).append(b)
+
+    def slot_start(slot):
+        info = slots.get(slot)
+        return (info.start_minute if info else 24 * 60, slot)
+
+    stops = []
+    position = None
+    for slot in sorted(by_slot, key=slot_start):
+        group = sorted(by_slot[slot], key=lambda b: b.name)
+        located = [(b.name, b.latitude, b.longitude) for b in group if geo.has_coordinates(b.latitude, b.longitude)]
+        ordered = order_stops(located, position)
+        rows = {b.name: b for b in group}
+        sequence = [rows[key] for key, _, _ in ordered]
+        sequence += [b for b in group if not geo.has_coordinates(b.latitude, b.longitude)]
+        if ordered:
+            position = ordered[-1][1:]
+
+        info = slots.get(slot)
+        for b in sequence:
+            user = users.get(b.customer) or {}
+            stops.append({
+                "id": b.name,
+                "seq": len(stops) + 1,
+                "slot": b.slot,
+                "time": info.start_time if info else None,
+                "status": b.status,
+                "customer": user.get("full_name") or "",
+                "phone": (
+                    b.customer_phone_qb if b.is_quick_booking == 1
+                    else b.customer_phone or user.get("mobile_no") or ""
+                ),
+                "state": states.get(b.state) or "",
+                "staff": b.staff_name or "",
+                "lat": b.latitude if geo.has_coordinates(b.latitude, b.longitude) else None,
+                "lng": b.longitude if geo.has_coordinates(b.latitude, b.longitude) else None,
+            })
+
+    located = [(s["lat"], s["lng"]) for s in stops if s["lat"] is not None]
+    return {
+        "driver": driver,
+        "date": str(date),
+        "distance_km": round(_path_length(located), 2),
+        "stops": stops,
+    }
+
+
+def get_manifest(driver, date):
+    cache = frappe.cache()
+    key = _key(driver, date)
+
+    manifest = cache.get_value(key)
+    if manifest is None:
+        manifest = build_manifest(driver, date)
+        cache.set_value(key, manifest, expires_in_sec=MANIFEST_TTL)
+
+    return manifest
+
+
+def clear_manifest(driver, date):
+    frappe.cache().delete_value(_key(driver, date))
+
+
+def on_booking_change(doc, method=None):
+    """Booking after_insert / on_update / on_trash: drop the manifests of the
+    old and new (driver, date), now and after commit."""
+    previous = doc.get_doc_before_save()
+
+    for d in (previous, doc):
+        if d and d.driver and d.date:
+            clear_manifest(d.driver, d.date)
+            frappe.db.after_commit.add(lambda driver=d.driver, date=d.date: clear_manifest(driver, date))
@@ -0,0 +1,203 @@
+"""Push notifications through an outbox.
+
+Request handlers only insert a Notification Outbox row and queue `dispatch`
+(once per transaction, after commit); they never wait on delivery. The
+worker takes queued rows in creation order, keeps only the newest row of
+each (device token, dedupe key) and marks the rest Coalesced, then sends one
+batch per device token through the configured transport.
+
+The transport is the dotted path in site config `salon_push_transport`, a
+class with `send(device_token, messages)` that raises on failure. Without it
+nothing is sent: rows stay Queued and the missing setting is logged once per
+worker. Tests get LocalTransport, which keeps the batches in memory.
+"""
+
+import frappe
+from frappe.utils import cint, now_datetime
+
+BATCH_SIZE = 500
+MAX_ATTEMPTS = 5
+DISPATCH_JOB = "salon_notification_dispatch"
+PENDING_FLAG = "salon_notification_dispatch"
+
+
+class LocalTransport:
+    """Records batches instead of sending them (tests)."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, device_token, messages):
+        self.sent.append((device_token, messages))
+
+
+_unconfigured_sites = set()
+
+
+def get_transport():
+    """The configured transport, LocalTransport under tests, else None."""
+    path = frappe.conf.get("salon_push_transport")
+    if path:
+        return frappe.get_attr(path)()
+
+    if frappe.flags.in_test:
+        if not frappe.flags.get("salon_local_transport"):
+            frappe.flags.salon_local_transport = LocalTransport()
+        return frappe.flags.salon_local_transport
+
+    if frappe.local.site not in _unconfigured_sites:
+        _unconfigured_sites.add(frappe.local.site)
+        frappe.log_error(
+            title="Notification Transport Missing",
+            message="salon_push_transport is not set in site config; notifications stay Queued",
+        )
+    return None
+
+
+def notify(device_token, title, message, data=None, dedupe_key=None, driver=None, reference=None):
+    """Queue one push message; delivery happens in the background after commit."""
+    if not device_token:
+        return
+
+    # new_doc applies the field defaults (status Queued, attempts 0), which
+    # db_insert alone would leave NULL
+    doc = frappe.new_doc("Notification Outbox")
+    doc.update({
+        "device_token": device_token,
+        "title": title,
+        "message": message,
+        "data": frappe.as_json(data or {}, indent=None),
+        "dedupe_key": dedupe_key,
+        "driver": driver,
+        "reference_doctype": reference.doctype if reference else None,
+        "reference_name": reference.name if reference else None,
+    })
+    doc.db_insert()
+
+    if not frappe.flags.get(PENDING_FLAG):
+        frappe.flags[PENDING_FLAG] = True
+        frappe.db.after_commit.add(_enqueue_dispatch)
+        frappe.db.after_rollback.add(_discard_dispatch)
+
+
+def _enqueue_dispatch():
+    frappe.flags.pop(PENDING_FLAG, None)
+    frappe.enqueue(
+        "salon.utils.notifications.dispatch",
+        queue="short",
+        job_id=DISPATCH_JOB,
+        deduplicate=True,
+    )
+
+
+def _discard_dispatch():
+    frappe.flags.pop(PENDING_FLAG, None)
+
+
+def _set_status(names, **values):
+    if not names:
+        return
+
+    Outbox = frappe.qb.DocType("Notification Outbox")
+    query = frappe.qb.update(Outbox).where(Outbox.name.isin(names))
+    for field, value in values.items():
+        query = query.set(Outbox[field], value)
+    query.run()
+
+
+def _coalesce(rows):
+    """{device token: newest row per dedupe key, oldest first} plus the names of the superseded rows."""
+    batches = {}
+    superseded = []
+    for row in rows:
+        batch = batches.setdefault(row.device_token, {})
+        key = row.dedupe_key or row.name
+        if key in batch:
+            superseded.append(batch.pop(key).name)
+        batch[key] = row
+
+    return {token: list(batch.values()) for token, batch in batches.items()}, superseded
+
+
+def dispatch():
+    """Send queued notifications, BATCH_SIZE rows at a time."""
+    transport = get_transport()
+    if not transport:
+        return
+
+    Outbox = frappe.qb.DocType("Notification Outbox")
+
+    last = 0
+    while True:
+        # keyset over the autoincrement name, so rows that failed in this run
+        # are left for the next one
+        rows = (
+            frappe.qb.from_(Outbox)
+            .select(
+                Outbox.name, Outbox.device_token, Outbox.dedupe_key, Outbox.attempts,
+                Outbox.title, Outbox.message, Outbox.data,
+            )
+            .where(Outbox.status == "Queued")
+            .where(Outbox.name > last)
+            .orderby(Outbox.name)
+            .limit(BATCH_SIZE)
+            .for_update(skip_locked=True)
+            .run(as_dict=True)
+        )
+        if not rows:
+            break
+
+        batches, superseded = _coalesce(rows)
+        _set_status(superseded, status="Coalesced")
+
+        sent = []
+        for device_token, batch in batches.items():
+            messages = [
+                {"title": r.title, "body": r.message, "data": frappe.parse_json(r.data or "{}")}
+                for r in batch
+            ]
+            try:
+                transport.send(device_token, messages)
+                sent.extend(r.name for r in batch)
+            except Exception as e:
+                frappe.log_error(frappe.get_traceback(), "Notification Dispatch Error")
+                for r in batch:
+                    attempts = cint(r.attempts) + 1
+                    _set_status(
+                        [r.name],
+                        attempts=attempts,
+                        error=str(e),
+                        status="Failed" if attempts >= MAX_ATTEMPTS else "Queued",
+                    )
+
+        _set_status(sent, status="Sent", sent_on=now_datetime())
+        frappe.db.commit()
+
+        if len(rows) < BATCH_SIZE:
+            break
+        last = rows[-1].name
+
+
+def on_booking_change(doc, method=None):
+    """Booking on_update: tell the assigned driver about a new assignment or
+    a status change."""
+    previous = doc.get_doc_before_save()
+    assigned = doc.driver and (not previous or previous.driver != doc.driver)
+    status_changed = previous and previous.status != doc.status
+
+    if not doc.driver or not (assigned or status_changed):
+        return
+
+    device_token = frappe.db.get_value("Drivers", doc.driver, "device_token")
+    if not device_token:
+        return
+
+    notify(
+        device_token,
+        title="New booking" if assigned else "Booking updated",
+        message=f"Booking {doc.name} on {doc.date}: {doc.status}",
+        data={"booking_id": doc.name, "status": doc.status, "date": str(doc.date or "")},
+        dedupe_key=f"booking:{doc.name}",
+        driver=doc.driver,
+        reference=doc,
+    )
@@ -0,0 +1,42 @@
+"""Realtime availability updates for the booking screen.
+
+After a Booking change commits, the slots that became busy or free for the
+affected employee-day are published on a room per (branch, date), so
+subscribed clients update in place instead of polling verify_slot and
+get_bookings_by_date. Clients join the room through the
+`salon_availability_subscribe` socket event (salon/realtime/handlers.js).
+"""
+
+import frappe
+
+AVAILABILITY_EVENT = "salon_availability"
+
+
+def availability_room(branch, date):
+    return f"salon_availability:{branch}:{date}"
+
+
+def publish_availability_delta(staff, date, branches, before, after):
+    """Publish the slots of (staff, date) that changed between `before` and
+    `after`; when `before` is unknown the full busy list is sent instead."""
+    if not branches:
+        return
+
+    message = {"employee_id": staff, "date": str(date)}
+
+    if before is None:
+        message["busy_slots"] = sorted(after)
+    else:
+        booked = sorted(after - before)
+        freed = sorted(before - after)
+        if not booked and not freed:
+            return
+        message["booked"] = booked
+        message["freed"] = freed
+
+    for branch in branches:
+        frappe.publish_realtime(
+            AVAILABILITY_EVENT,
+            dict(message, branch_id=branch),
+            room=availability_room(branch, date),
+        )
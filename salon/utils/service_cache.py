@@ -0,0 +1,152 @@
+"""Two-tier cache of the Service fields used to serialize booking line items.
+
+A per-worker LRU sits in front of a Redis hash holding one compact tuple per
+Service. Saving or deleting a Service drops its hash entry and bumps a version
+key; workers compare that version once per request and clear their LRU when it
+has moved.
+"""
+
+import pickle
+import threading
+from collections import OrderedDict
+
+import frappe
+
+CACHE_KEY = "salon:service_catalog"
+VERSION_KEY = "salon:service_catalog_version"
+LOCAL_CACHE_SIZE = 2048
+
+SERVICE_FIELDS = (
+    "name",
+    "english_name",
+    "arabic_name",
+    "english_description",
+    "arabic_description",
+    "duration",
+    "price",
+    "category",
+    "subcategory",
+    "image",
+    "gift",
+)
+
+
+class ServiceInfo:
+    __slots__ = SERVICE_FIELDS
+
+    def __init__(self, *values):
+        for field, value in zip(SERVICE_FIELDS, values):
+            setattr(self, field, value)
+
+    def to_tuple(self):
+        return tuple(getattr(self, field) for field in SERVICE_FIELDS)
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.versions = {}
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear_site(self, site):
+        with self._lock:
+            for key in [k for k in self._data if k[0] == site]:
+                del self._data[key]
+
+
+_local_cache = LRUCache(LOCAL_CACHE_SIZE)
+
+
+def _sync_version(site):
+    version = frappe.cache().get_value(VERSION_KEY)
+    if _local_cache.versions.get(site) != version:
+        _local_cache.clear_site(site)
+        _local_cache.versions[site] = version
+
+
+def get_services(names):
+    """Return {service name: ServiceInfo} for the given names.
+
+    Steady state is served from the worker LRU; misses go to the Redis hash
+    in one HMGET and then to the database in one query.
+    """
+    names = {str(n) for n in names if n}
+    if not names:
+        return {}
+
+    site = frappe.local.site
+    _sync_version(site)
+
+    result = {}
+    missing = []
+    for name in names:
+        info = _local_cache.get((site, name))
+        if info is None:
+            missing.append(name)
+        else:
+            result[name] = info
+
+    if not missing:
+        return result
+
+    cache = frappe.cache()
+    redis_key = cache.make_key(CACHE_KEY)
+
+    not_cached = []
+    for name, value in zip(missing, cache.hmget(redis_key, missing)):
+        if value is None:
+            not_cached.append(name)
+            continue
+
+        info = ServiceInfo(*pickle.loads(value))
+        _local_cache.set((site, name), info)
+        result[name] = info
+
+    if not_cached:
+        rows = frappe.get_all(
+            "Service",
+            filters={"name": ["in", not_cached]},
+            fields=list(SERVICE_FIELDS),
+            as_list=True,
+        )
+
+        pipe = cache.pipeline()
+        for row in rows:
+            info = ServiceInfo(*row)
+            name = str(info.name)
+            pipe.hset(redis_key, name, pickle.dumps(info.to_tuple()))
+            _local_cache.set((site, name), info)
+            result[name] = info
+        pipe.execute()
+
+    return result
+
+
+def _clear(name):
+    cache = frappe.cache()
+    cache.hdel(CACHE_KEY, name)
+    cache.set_value(VERSION_KEY, frappe.generate_hash(length=10))
+    _local_cache.clear_site(frappe.local.site)
+
+
+def invalidate(doc, method=None):
+    name = str(doc.name)
+    _clear(name)
+    # clear again once the change is visible, so a concurrent reader cannot
+    # re-cache the pre-commit row
+    frappe.db.after_commit.add(lambda: _clear(name))
@@ -0,0 +1,206 @@
+"""Bilingual (English / Arabic) search over enabled Services.
+
+Names and descriptions are normalized once (case folding, Arabic diacritics
+and tatweel stripped, alef / hamza / taa marbuta / alef maqsura folded) and
+kept in a Redis hash, one entry per Service, updated from Service doc_events.
+Each worker builds an in-memory index from that hash: a sorted token list for
+prefix matches and trigram postings for fuzzy matches. A version key tells
+workers when to rebuild.
+"""
+
+import pickle
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+
+import frappe
+
+CACHE_KEY = "salon:service_search"
+# field set in CACHE_KEY once it holds every service; written with the
+# entries, so an evicted or cleared hash also loses it
+BUILT_FIELD = "__built__"
+VERSION_KEY = "salon:service_search_version"
+
+ARABIC_DIACRITICS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+NON_WORD = re.compile(r"[^\w]+")
+ARABIC_FOLD = str.maketrans(
+    {
+        "أ": "ا",  # alef with hamza above
+        "إ": "ا",  # alef with hamza below
+        "آ": "ا",  # alef with madda
+        "ٱ": "ا",  # alef wasla
+        "ؤ": "و",  # waw with hamza
+        "ئ": "ي",  # yeh with hamza
+        "ى": "ي",  # alef maqsura
+        "ة": "ه",  # taa marbuta
+    }
+)
+
+# score weights
+EXACT_NAME_TOKEN = 4
+NAME_PREFIX = 3
+DESCRIPTION_PREFIX = 1
+NAME_TRIGRAM = 2
+MIN_TRIGRAM_SIMILARITY = 0.5
+
+ARABIC_ARTICLE = "ال"
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = ARABIC_DIACRITICS.sub("", text).translate(ARABIC_FOLD)
+    return NON_WORD.sub(" ", text).strip()
+
+
+def tokens(text):
+    """Tokens of normalized text; Arabic words also indexed without the
+    definite article, so "الشعر" and "شعر" match each other."""
+    result = set()
+    for word in text.split():
+        result.add(word)
+        if word.startswith(ARABIC_ARTICLE) and len(word) > len(ARABIC_ARTICLE) + 1:
+            result.add(word[len(ARABIC_ARTICLE) :])
+    return result
+
+
+def trigrams(text):
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchIndex:
+    def __init__(self, entries):
+        """`entries`: {service name: (normalized name, normalized description)}."""
+        self.name_tokens = sorted(
+            (token, name) for name, (text, _) in entries.items() for token in tokens(text)
+        )
+        self.description_tokens = sorted(
+            (token, name) for name, (_, text) in entries.items() for token in tokens(text)
+        )
+        self.name_trigrams = {}
+        for name, (text, _) in entries.items():
+            for gram in trigrams(text):
+                self.name_trigrams.setdefault(gram, set()).add(name)
+
+    @staticmethod
+    def _prefixed(tokens, prefix):
+        i = bisect_left(tokens, (prefix, ""))
+        while i < len(tokens) and tokens[i][0].startswith(prefix):
+            yield tokens[i]
+            i += 1
+
+    def search(self, query, limit=None):
+        """Service names matching `query`, best first."""
+        query = normalize(query)
+        if not query:
+            return []
+
+        scores = {}
+
+        for word in query.split():
+            token = word[len(ARABIC_ARTICLE) :] if word.startswith(ARABIC_ARTICLE) and len(word) > len(ARABIC_ARTICLE) + 1 else word
+            for name_token, name in self._prefixed(self.name_tokens, token):
+                weight = EXACT_NAME_TOKEN if name_token == token else NAME_PREFIX
+                scores[name] = scores.get(name, 0) + weight
+            for _, name in self._prefixed(self.description_tokens, token):
+                scores[name] = scores.get(name, 0) + DESCRIPTION_PREFIX
+
+        query_grams = trigrams(query)
+        shared = {}
+        for gram in query_grams:
+            for name in self.name_trigrams.get(gram, ()):
+                shared[name] = shared.get(name, 0) + 1
+
+        # share of the query's trigrams found in the name, so misspelt or
+        # partial words still match
+        for name, count in shared.items():
+            similarity = count / len(query_grams)
+            if similarity >= MIN_TRIGRAM_SIMILARITY or name in scores:
+                scores[name] = scores.get(name, 0) + NAME_TRIGRAM * similarity
+
+        ranked = sorted(scores, key=lambda name: (-scores[name], name))
+        return ranked[:limit] if limit else ranked
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def _entry(service):
+    name = f"{service.english_name or ''} {service.arabic_name or ''}"
+    description = f"{service.english_description or ''} {service.arabic_description or ''}"
+    return normalize(name), normalize(description)
+
+
+def _load_entries():
+    cache = frappe.cache()
+    entries = {frappe.safe_decode(name): entry for name, entry in (cache.hgetall(CACHE_KEY) or {}).items()}
+    if entries.pop(BUILT_FIELD, None):
+        return entries
+
+    services = frappe.get_all(
+        "Service",
+        filters={"disabled": 0},
+        fields=["name", "english_name", "arabic_name", "english_description", "arabic_description"],
+    )
+    entries = {str(s.name): _entry(s) for s in services}
+
+    redis_key = cache.make_key(CACHE_KEY)
+    pipe = cache.pipeline()
+    pipe.delete(redis_key)
+    for name, entry in entries.items():
+        pipe.hset(redis_key, name, pickle.dumps(entry))
+    pipe.hset(redis_key, BUILT_FIELD, pickle.dumps(True))
+    pipe.execute()
+
+    return entries
+
+
+def get_index():
+    site = frappe.local.site
+    version = frappe.cache().get_value(VERSION_KEY)
+
+    cached = _indexes.get(site)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    with _lock:
+        index = SearchIndex(_load_entries())
+        _indexes[site] = (version, index)
+
+    return index
+
+
+def search_services(query, limit=None):
+    """Names of enabled services matching `query`, best first."""
+    return get_index().search(query, limit)
+
+
+def _bump_version():
+    frappe.cache().set_value(VERSION_KEY, frappe.generate_hash(length=10))
+
+
+def _is_built():
+    return frappe.cache().hexists(CACHE_KEY, BUILT_FIELD)
+
+
+def update_service(doc, method=None):
+    """Service on_update: re-index one service (the next load rebuilds
+    everything when the hash is not built)."""
+    if _is_built():
+        if doc.disabled:
+            frappe.cache().hdel(CACHE_KEY, str(doc.name))
+        else:
+            frappe.cache().hset(CACHE_KEY, str(doc.name), _entry(doc))
+    _bump_version()
+
+
+def remove_service(doc, method=None):
+    """Service on_trash."""
+    if _is_built():
+        frappe.cache().hdel(CACHE_KEY, str(doc.name))
+    _bump_version()
@@ -0,0 +1,115 @@
+"""Short-lived slot holds kept in Redis.
+
+A hold is a key per (staff, date, slot) whose value is the token handed to
+the client that placed it, written with SET NX EX so only one client can hold
+a slot and the key disappears on its own when the TTL runs out. A sorted set
+per (staff, date), scored by expiry time, lists the held slots of a day
+without scanning keys; stale members are ignored on read and the set itself
+expires shortly after its last hold.
+"""
+
+import time
+
+import frappe
+from frappe.utils import cint, getdate
+
+DEFAULT_HOLD_TTL = 300
+MAX_HOLD_TTL = 900
+
+# compare-and-set scripts, so only the token owner can renew or release
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def get_hold_ttl(ttl):
+    ttl = cint(ttl) or DEFAULT_HOLD_TTL
+    return max(1, min(ttl, MAX_HOLD_TTL))
+
+
+def _hold_key(staff, date, slot):
+    return frappe.cache().make_key(f"salon:slot_hold:{staff}:{getdate(date)}:{slot}")
+
+
+def _index_key(staff, date):
+    return frappe.cache().make_key(f"salon:slot_holds:{staff}:{getdate(date)}")
+
+
+def _index(pipe, staff, date, slot, ttl):
+    index_key = _index_key(staff, date)
+    pipe.zadd(index_key, {str(slot): time.time() + ttl})
+    pipe.expire(index_key, MAX_HOLD_TTL)
+
+
+def place_hold(staff, date, slot, ttl=None):
+    """Hold a slot; returns the hold token, or None if it is already held."""
+    ttl = get_hold_ttl(ttl)
+    token = frappe.generate_hash(length=20)
+
+    cache = frappe.cache()
+    if not cache.set(_hold_key(staff, date, slot), token, nx=True, ex=ttl):
+        return None
+
+    pipe = cache.pipeline()
+    _index(pipe, staff, date, slot, ttl)
+    pipe.execute()
+
+    return token
+
+
+def renew_hold(staff, date, slot, token, ttl=None):
+    ttl = get_hold_ttl(ttl)
+
+    cache = frappe.cache()
+    if not cache.eval(RENEW_SCRIPT, 1, _hold_key(staff, date, slot), token, ttl):
+        return False
+
+    pipe = cache.pipeline()
+    _index(pipe, staff, date, slot, ttl)
+    pipe.execute()
+
+    return True
+
+
+def release_hold(staff, date, slot, token):
+    cache = frappe.cache()
+    if not cache.eval(RELEASE_SCRIPT, 1, _hold_key(staff, date, slot), token):
+        return False
+
+    cache.zrem(_index_key(staff, date), str(slot))
+    return True
+
+
+def is_held(staff, date, slot, token=None):
+    """True when the slot is held by anyone other than the owner of `token`."""
+    value = frappe.cache().get(_hold_key(staff, date, slot))
+    if value is None:
+        return False
+
+    return not token or value.decode() != token
+
+
+def get_held_slots(staff, date, token=None):
+    """Slot ids of (staff, date) held by anyone other than the owner of `token`."""
+    cache = frappe.cache()
+    slots = [m.decode() for m in cache.zrangebyscore(_index_key(staff, date), time.time(), "+inf")]
+
+    if not slots:
+        return []
+
+    # the index may still list a slot released by its owner; the hold keys are authoritative
+    values = cache.mget([_hold_key(staff, date, slot) for slot in slots])
+    return [
+        slot for slot, value in zip(slots, values)
+        if value is not None and (not token or value.decode() != token)
+    ]
@@ -0,0 +1,93 @@
+"""Cached Time Slot table.
+
+Time Slot stores `start_minute` / `end_minute` (minutes after midnight, the
+end not wrapped at 24h) computed on save, so nothing here parses time
+strings per request. All slots are kept as one Redis value and the slot ids
+of each branch in a Redis hash; Time Slot and Branches doc_events drop them.
+"""
+
+from collections import namedtuple
+
+import frappe
+from frappe.utils import cint, get_time
+
+SLOTS_KEY = "salon:time_slots"
+BRANCH_SLOTS_KEY = "salon:branch_slots"
+
+SlotInfo = namedtuple(
+    "SlotInfo", ["id", "start_time", "end_time", "duration", "start_minute", "end_minute", "disabled"]
+)
+
+
+def get_slot_minutes(service_time, duration):
+    """(start_minute, end_minute) of a slot starting at `service_time`."""
+    start = 0
+    if service_time:
+        t = get_time(service_time)
+        start = t.hour * 60 + t.minute
+
+    return start, start + cint(duration)
+
+
+def format_minutes(minutes):
+    minutes = cint(minutes) % (24 * 60)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+
+def _load_slots():
+    rows = frappe.get_all(
+        "Time Slot",
+        fields=["name", "service_time", "duration", "start_minute", "end_minute", "disable"],
+        order_by="start_minute asc",
+    )
+
+    return {
+        str(r.name): SlotInfo(
+            r.name,
+            str(r.service_time) if r.service_time else None,
+            format_minutes(r.end_minute) if r.service_time else "",
+            r.duration or 0,
+            cint(r.start_minute),
+            cint(r.end_minute),
+            cint(r.disable),
+        )
+        for r in rows
+    }
+
+
+def get_all_slots():
+    """{slot id: SlotInfo} for every Time Slot, ordered by start."""
+    return frappe.cache().get_value(SLOTS_KEY, generator=_load_slots)
+
+
+def get_slots(slot_ids):
+    slots = get_all_slots()
+    return {str(s): slots[str(s)] for s in slot_ids if str(s) in slots}
+
+
+def _load_branch_slot_ids(branch_id):
+    return frappe.get_all(
+        "Branches Slot Table",
+        filters={"parent": branch_id, "parenttype": "Branches"},
+        pluck="time_slot",
+    )
+
+
+def get_branch_slots(branch_id):
+    """Enabled slots of a branch as SlotInfo tuples ordered by start."""
+    slot_ids = frappe.cache().hget(
+        BRANCH_SLOTS_KEY, str(branch_id), generator=lambda: _load_branch_slot_ids(branch_id)
+    )
+    slot_ids = {str(s) for s in slot_ids or [] if s}
+
+    return [s for s in get_all_slots().values() if str(s.id) in slot_ids and not s.disabled]
+
+
+def clear_slot_cache(doc=None, method=None):
+    """Time Slot on_update / on_trash."""
+    frappe.cache().delete_value(SLOTS_KEY)
+
+
+def clear_branch_slot_cache(doc, method=None):
+    """Branches on_update / on_trash."""
+    frappe.cache().hdel(BRANCH_SLOTS_KEY, str(doc.name))
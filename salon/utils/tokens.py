@@ -0,0 +1,145 @@
+"""Stateless signed API tokens for the mobile apps.
+
+A token is `<payload>.<signature>`: the payload is base64url JSON with the
+user (`sub`), type (`access` or `refresh`), expiry and a random id (`jti`),
+signed with HMAC-SHA256 under the site's `salon_token_secret` (the site
+encryption key when unset). Checking one needs no session or database
+lookup: the signature, the expiry and a revocation set.
+
+Revoked ids live in a Redis sorted set scored by their token's expiry, and
+each worker mirrors it in memory, re-reading it at most every
+REVOCATION_REFRESH seconds; a revocation reaches other workers within that
+window.
+
+Clients send the access token in the `X-Salon-Token` header (the
+Authorization header is left to Frappe's own OAuth / API key handling);
+`authenticate` is registered as an auth hook.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+
+import frappe
+from frappe.utils import cint
+from frappe.utils.password import get_encryption_key
+
+ACCESS_TTL = 15 * 60
+REFRESH_TTL = 30 * 24 * 60 * 60
+REVOCATION_REFRESH = 5
+HEADER = "X-Salon-Token"
+REVOKED_KEY = "salon:revoked_tokens"
+
+_revoked = {}  # site -> (loaded at, set of jti)
+_lock = threading.Lock()
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _secret():
+    return (frappe.conf.get("salon_token_secret") or get_encryption_key()).encode()
+
+
+def _sign(payload):
+    return _b64encode(hmac.new(_secret(), payload.encode(), hashlib.sha256).digest())
+
+
+def make_token(user, token_type, ttl):
+    now = int(time.time())
+    payload = _b64encode(
+        json.dumps(
+            {"sub": user, "typ": token_type, "iat": now, "exp": now + ttl, "jti": frappe.generate_hash(length=16)},
+            separators=(",", ":"),
+        ).encode()
+    )
+    return f"{payload}.{_sign(payload)}"
+
+
+def issue_tokens(user):
+    """A fresh access / refresh token pair for `user`."""
+    return {
+        "access_token": make_token(user, "access", ACCESS_TTL),
+        "refresh_token": make_token(user, "refresh", REFRESH_TTL),
+        "expires_in": ACCESS_TTL,
+    }
+
+
+def decode(token, token_type="access"):
+    """The payload of a valid, unexpired, unrevoked token of `token_type`, else None."""
+    try:
+        payload, signature = (token or "").split(".")
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, TypeError):
+        return None
+
+    if claims.get("typ") != token_type or cint(claims.get("exp")) <= time.time():
+        return None
+
+    if claims.get("jti") in _revoked_ids():
+        return None
+
+    return claims
+
+
+def _revoked_ids():
+    site = frappe.local.site
+    loaded = _revoked.get(site)
+    now = time.time()
+    if loaded and now - loaded[0] < REVOCATION_REFRESH:
+        return loaded[1]
+
+    with _lock:
+        cache = frappe.cache()
+        key = cache.make_key(REVOKED_KEY)
+        pipe = cache.pipeline()
+        pipe.zremrangebyscore(key, "-inf", now)
+        pipe.zrangebyscore(key, now, "+inf")
+        _, ids = pipe.execute()
+
+        revoked = {i.decode() for i in ids}
+        _revoked[site] = (now, revoked)
+
+    return revoked
+
+
+def revoke(claims):
+    """Revoke the token with these (already verified) claims."""
+    cache = frappe.cache()
+    cache.zadd(cache.make_key(REVOKED_KEY), {claims["jti"]: cint(claims["exp"])})
+
+    loaded = _revoked.get(frappe.local.site)
+    if loaded:
+        loaded[1].add(claims["jti"])
+
+
+def refresh(refresh_token):
+    """Rotate a refresh token: revoke it and issue a new pair. None when it
+    is invalid or its user is disabled."""
+    claims = decode(refresh_token, "refresh")
+    if not claims or not frappe.db.get_value("User", claims["sub"], "enabled"):
+        return None
+
+    revoke(claims)
+    return issue_tokens(claims["sub"])
+
+
+def authenticate():
+    """Auth hook: log the request in as the owner of a valid X-Salon-Token."""
+    token = frappe.get_request_header(HEADER)
+    if not token:
+        return
+
+    claims = decode(token)
+    if claims:
+        frappe.set_user(claims["sub"])
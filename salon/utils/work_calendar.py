@@ -0,0 +1,101 @@
+"""Employee working calendars: weekly off-days plus dated holidays.
+
+An employee's calendar is (weekday mask, set of holiday dates): bit `i` of
+the mask is set when weekday `i` (Monday = 0) is a weekly off-day, taken
+from the `custom_holidays` field; the dates come from the Holiday List linked
+on the Employee. Calendars are parsed once and kept in a Redis hash,
+one field per employee, dropped on Employee save and cleared whenever a
+Holiday List changes, so checking a date is a bit test and a set lookup.
+"""
+
+import pickle
+import re
+
+import frappe
+from frappe.utils import getdate
+
+CACHE_KEY = "salon:employee_calendar"
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+SEPARATORS = re.compile(r"[\s,;|]+")
+NO_OFF_DAYS = (0, frozenset())
+
+
+def parse_weekly_off(value):
+    """Weekday mask of a custom_holidays value ("Friday", "Friday, Saturday")."""
+    mask = 0
+    for word in SEPARATORS.split((value or "").casefold()):
+        if word in WEEKDAYS:
+            mask |= 1 << WEEKDAYS.index(word)
+    return mask
+
+
+def _load_calendars(employees):
+    rows = frappe.get_all(
+        "Employee",
+        filters={"name": ["in", employees]},
+        fields=["name", "custom_holidays", "holiday_list"],
+    )
+
+    holiday_lists = {r.holiday_list for r in rows if r.holiday_list}
+    holidays = {}
+    if holiday_lists:
+        for parent, holiday_date in frappe.get_all(
+            "Holiday",
+            filters={"parenttype": "Holiday List", "parent": ["in", list(holiday_lists)]},
+            fields=["parent", "holiday_date"],
+            as_list=True,
+        ):
+            holidays.setdefault(parent, set()).add(holiday_date)
+
+    return {
+        str(r.name): (parse_weekly_off(r.custom_holidays), frozenset(holidays.get(r.holiday_list, ())))
+        for r in rows
+    }
+
+
+def get_calendars(employees):
+    """{employee: (weekday mask, frozenset of holiday dates)} for `employees`."""
+    employees = list(dict.fromkeys(str(e) for e in employees if e))
+    if not employees:
+        return {}
+
+    cache = frappe.cache()
+    redis_key = cache.make_key(CACHE_KEY)
+
+    calendars = {}
+    for employee, value in zip(employees, cache.hmget(redis_key, employees)):
+        if value is not None:
+            calendars[employee] = pickle.loads(value)
+
+    missing = [e for e in employees if e not in calendars]
+    if missing:
+        loaded = _load_calendars(missing)
+        pipe = cache.pipeline()
+        for employee in missing:
+            calendars[employee] = loaded.get(employee, NO_OFF_DAYS)
+            pipe.hset(redis_key, employee, pickle.dumps(calendars[employee]))
+        pipe.execute()
+
+    return calendars
+
+
+def is_off(calendar, date):
+    mask, holidays = calendar
+    date = getdate(date)
+    return bool(mask >> date.weekday() & 1) or date in holidays
+
+
+def is_working(employee, date):
+    """False when `date` is a weekly off-day or holiday of `employee`."""
+    calendar = get_calendars([employee]).get(str(employee), NO_OFF_DAYS)
+    return not is_off(calendar, date)
+
+
+def clear_employee_calendar(doc, method=None):
+    """Employee on_update / on_trash."""
+    frappe.cache().hdel(CACHE_KEY, str(doc.name))
+
+
+def clear_calendars(doc=None, method=None):
+    """Holiday List on_update / on_trash: dates may be shared by many employees."""
+    frappe.cache().delete_value(CACHE_KEY)